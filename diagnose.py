@@ -1,8 +1,43 @@
+import argparse
+import glob
 import json
 import os
+import statistics
+import shutil
+import subprocess
 import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
 
+# Services the bot depends on. Override with "diagnose_endpoints" in settings.json
+# or --endpoint name=url, e.g. to point at a local stand-in.
+DEFAULT_ENDPOINTS = {
+    'telegram': 'https://api.telegram.org',
+    'gemini': 'https://generativelanguage.googleapis.com',
+    'gmail': 'https://gmail.googleapis.com',
+    'calendar': 'https://www.googleapis.com/calendar/v3',
+    'tasks': 'https://tasks.googleapis.com',
+    'oauth': 'https://oauth2.googleapis.com/token',
+}
+
+# Limits above which a measurement fails the run. Override with "diagnose_thresholds" in settings.json.
+DEFAULT_THRESHOLDS = {
+    'import_seconds': 5.0,
+    'latency_ms': 1000.0,
+    'token_refresh_ms': 2000.0,
+    'executor_wait_ms': 500.0,
+    'log_mb': 100.0,
+    'cache_mb': 200.0,
+}
+
+LOG_FILES = ['kernel.log*', 'kernel-*.log*', 'kernel_events*.jsonl*']
+CACHE_FILES = [
+    'mail_index.json', 'mail_index_vectors.npy', 'work_queue.db*', 'triage_examples.jsonl',
+    'triage_model.npz', 'report_state.json', 'profiles/*'
+]
+
 def check_secrets():
     print("--- Diagnostic Tool ---")
     if not os.path.exists('secrets.json'):
@@ -55,8 +90,242 @@ def check_secrets():
     else:
         print(f"⚠️  'allowed_telegram_user_ids' has unexpected type: {type(allowed)}.")
 
-    print("\n--- End of Diagnostic ---")
     return True
 
-if __name__ == "__main__":
+def load_settings():
+    try:
+        with open('settings.json', 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def src_modules():
+    """Returns the importable src modules.
+
+    The Streamlit pages run on import, and the worker names its log file after
+    its command line, so they are skipped. The worker imports nothing the bot does not.
+    """
+    skipped = {os.path.join('src', 'dashboard.py'), os.path.join('src', 'worker.py')}
+    modules = []
+    for path in sorted(glob.glob('src/**/*.py', recursive=True)):
+        if path.startswith(os.path.join('src', 'pages')) or path in skipped:
+            continue
+        module = path[:-3].replace(os.sep, '.')
+        modules.append(module[:-len('.__init__')] if module.endswith('.__init__') else module)
+    return modules
+
+def offline_workdir():
+    """Returns a temporary working directory for the import measurements.
+
+    It has the settings and data files, but no token.json, OAuth client
+    secrets or Gemini key: importing GoogleSuite can then neither refresh a
+    token nor open the browser sign-in, and the Brain stays offline.
+    """
+    workdir = tempfile.mkdtemp(prefix='kernel-diagnose-')
+    for pattern in ['settings.json', *CACHE_FILES]:
+        for path in glob.glob(pattern):
+            if os.path.dirname(path) == '':
+                os.symlink(os.path.abspath(path), os.path.join(workdir, path))
+
+    secrets = {}
+    if os.path.exists('secrets.json'):
+        try:
+            with open('secrets.json', 'r') as f:
+                secrets = json.load(f)
+        except json.JSONDecodeError:
+            pass
+    for key in ('gemini_api_key', 'google_client_secrets_file'):
+        secrets.pop(key, None)
+    with open(os.path.join(workdir, 'secrets.json'), 'w') as f:
+        json.dump(secrets, f)
+    return workdir
+
+def measure_imports(timeout):
+    """Imports each src module in a fresh interpreter and returns {module: seconds or None on failure}.
+
+    Imports run in `offline_workdir`, so they measure loading code and data, not Google or Gemini.
+    """
+    print("\n🔄 Measuring cold import times (Google and Gemini disabled)...")
+    workdir = offline_workdir()
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [os.getcwd(), os.environ.get('PYTHONPATH')]))}
+    try:
+        return _measure_imports(timeout, workdir, env)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _measure_imports(timeout, workdir, env):
+    results = {}
+    for module in src_modules():
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        try:
+            proc = subprocess.run(
+                [sys.executable, '-c', code], capture_output=True, text=True, timeout=timeout, cwd=workdir, env=env
+            )
+        except subprocess.TimeoutExpired:
+            print(f"❌ {module}: timed out after {timeout}s")
+            results[module] = float(timeout)
+            continue
+        if proc.returncode != 0:
+            print(f"⚠️  {module}: import failed ({proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode})")
+            results[module] = None
+            continue
+        results[module] = float(proc.stdout.strip().splitlines()[-1])
+        print(f"ℹ️  {module}: {results[module]:.2f}s")
+    return results
+
+def measure_latency(endpoints, samples, timeout, token=None):
+    """Times round trips to each endpoint. Any HTTP answer counts, only the time matters."""
+    print(f"\n🔄 Measuring latency ({samples} samples per endpoint)...")
+    results = {}
+    for name, url in endpoints.items():
+        if name == 'telegram' and token:
+            url = f"{url}/bot{token}/getMe"
+        times = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            try:
+                requests.get(url, timeout=timeout)
+            except requests.RequestException as e:
+                print(f"❌ {name}: {type(e).__name__}")
+                break
+            times.append((time.perf_counter() - start) * 1000)
+        if not times:
+            results[name] = None
+            continue
+        results[name] = {'p50': statistics.median(times), 'max': max(times)}
+        print(f"ℹ️  {name}: p50 {results[name]['p50']:.0f}ms, max {results[name]['max']:.0f}ms")
+    return results
+
+def measure_token_refresh(token_uri):
+    """Times a Google OAuth token refresh from token.json, without saving the new token."""
+    print("\n🔄 Measuring Google token refresh...")
+    if not os.path.exists('token.json'):
+        print("⚠️  'token.json' not found, skipping.")
+        return None
+    try:
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+    except ImportError:
+        print("⚠️  google-auth is not installed, skipping.")
+        return None
+
+    with open('token.json', 'r') as f:
+        info = json.load(f)
+    info['token_uri'] = token_uri
+    creds = Credentials.from_authorized_user_info(info)
+    start = time.perf_counter()
+    try:
+        creds.refresh(Request())
+    except Exception as e:
+        print(f"❌ Token refresh failed: {e}")
+        return None
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"ℹ️  Token refresh: {elapsed:.0f}ms")
+    return elapsed
+
+def measure_executor(settings, call_ms):
+    """Simulates a burst on the default asyncio executor and returns the p95 queue wait in ms.
+
+    The burst is what the bot can have in flight at once: every concurrent chat
+    update plus the background jobs, each blocking for a typical Google call.
+    """
+    workers = min(32, (os.cpu_count() or 1) + 4)  # asyncio's default executor size
+    burst = settings.get('max_concurrent_updates', 8) + 6
+    print(f"\n🔄 Simulating {burst} blocking calls of {call_ms:.0f}ms on {workers} executor threads...")
+
+    submitted = time.perf_counter()
+    def job():
+        wait = (time.perf_counter() - submitted) * 1000
+        time.sleep(call_ms / 1000)
+        return wait
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        waits = sorted(executor.map(lambda _: job(), range(burst)))
+    p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+    print(f"ℹ️  Executor queue wait: p95 {p95:.0f}ms")
+    return p95
+
+def measure_files(patterns):
+    """Returns the total size in MB of the files matching `patterns`."""
+    total = 0
+    for pattern in patterns:
+        for path in glob.glob(pattern):
+            if os.path.isfile(path):
+                total += os.path.getsize(path)
+    return total / 1024 / 1024
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Checks the Kernel setup and probes for performance bottlenecks.")
+    parser.add_argument('--samples', type=int, default=5, help="Latency samples per endpoint.")
+    parser.add_argument('--timeout', type=float, default=30, help="Timeout in seconds for each import and request.")
+    parser.add_argument('--endpoint', action='append', default=[], metavar='NAME=URL', help="Override an endpoint.")
+    parser.add_argument('--skip-imports', action='store_true', help="Skip the cold import measurements.")
+    parser.add_argument('--skip-network', action='store_true', help="Skip latency and token refresh measurements.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    settings = load_settings()
+    endpoints = {**DEFAULT_ENDPOINTS, **settings.get('diagnose_endpoints', {})}
+    for override in args.endpoint:
+        name, _, url = override.partition('=')
+        endpoints[name] = url
+    thresholds = {**DEFAULT_THRESHOLDS, **settings.get('diagnose_thresholds', {})}
+
     check_secrets()
+    token = None
+    if os.path.exists('secrets.json'):
+        try:
+            with open('secrets.json', 'r') as f:
+                token = json.load(f).get('telegram_bot_token')
+        except json.JSONDecodeError:
+            pass
+
+    # (what, measured, threshold, unit)
+    findings = []
+
+    if not args.skip_imports:
+        for module, seconds in measure_imports(args.timeout).items():
+            if seconds is None:
+                findings.append((f"import {module} failed", float('inf'), thresholds['import_seconds'], 's'))
+            else:
+                findings.append((f"import {module}", seconds, thresholds['import_seconds'], 's'))
+
+    google_ms = 200.0
+    if not args.skip_network:
+        latency = measure_latency(endpoints, args.samples, args.timeout, token)
+        for name, result in latency.items():
+            if result is None:
+                findings.append((f"{name} unreachable", float('inf'), thresholds['latency_ms'], 'ms'))
+            else:
+                findings.append((f"{name} latency (p50)", result['p50'], thresholds['latency_ms'], 'ms'))
+        google = [r['p50'] for n, r in latency.items() if r and n in ('gmail', 'calendar', 'tasks')]
+        if google:
+            google_ms = max(google)
+
+        refresh_ms = measure_token_refresh(endpoints['oauth'])
+        if refresh_ms is not None:
+            findings.append(("token refresh", refresh_ms, thresholds['token_refresh_ms'], 'ms'))
+
+    findings.append(("executor queue wait (p95)", measure_executor(settings, google_ms), thresholds['executor_wait_ms'], 'ms'))
+    findings.append(("log files", measure_files(LOG_FILES), thresholds['log_mb'], 'MB'))
+    findings.append(("local caches", measure_files(CACHE_FILES), thresholds['cache_mb'], 'MB'))
+
+    # Ranked by how close each measurement is to its threshold
+    print("\n--- Bottlenecks ---")
+    findings.sort(key=lambda f: f[1] / f[2], reverse=True)
+    failed = False
+    for what, value, threshold, unit in findings[:15]:
+        ratio = value / threshold
+        icon = "❌" if ratio > 1 else "⚠️ " if ratio > 0.7 else "✅"
+        failed = failed or ratio > 1
+        if value == float('inf'):
+            print(f"{icon} {what}")
+        else:
+            print(f"{icon} {what}: {value:.2f}{unit} (limit {threshold:g}{unit})")
+
+    print("\n--- End of Diagnostic ---")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
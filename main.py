@@ -1,11 +1,49 @@
 import sys
 import subprocess
 import os
+import time
 
 def run_bot():
     print("Starting Kernel...")
-    # Use python from the current environment, running as a module to fix imports
-    subprocess.run([sys.executable, "-m", "src.bot"])
+    from src.config import config
+    num_workers = int(config.get_setting("worker_processes", 0))
+    if num_workers <= 0:
+        # Use python from the current environment, running as a module to fix imports
+        subprocess.run([sys.executable, "-m", "src.bot"])
+        return
+
+    # Split mode: the bot process plus N workers sharing the work queue. Only chat and
+    # voice messages go to the workers, background jobs stay in the bot process.
+    # Each chat is pinned to one worker, which keeps its conversation history.
+    # Crashed workers are restarted and retry their unfinished jobs.
+    print(f"Starting ingestion process with {num_workers} workers...")
+    bot = subprocess.Popen([sys.executable, "-m", "src.bot"])
+    workers = {}
+
+    def start_worker(i):
+        workers[i] = subprocess.Popen([sys.executable, "-m", "src.worker", f"worker-{i}", str(i), str(num_workers)])
+
+    for i in range(num_workers):
+        start_worker(i)
+
+    try:
+        while bot.poll() is None:
+            for i, proc in list(workers.items()):
+                if proc.poll() is not None:
+                    print(f"Worker {i} exited with code {proc.returncode}, restarting...")
+                    start_worker(i)
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in [bot, *workers.values()]:
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in [bot, *workers.values()]:
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
 
 def run_dashboard():
     print("Starting Dashboard...")
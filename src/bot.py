@@ -4,19 +4,17 @@ import sys
 import datetime
 import tempfile
 import os
-from telegram import Update, Bot
+import signal
+from telegram import Update, Bot, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.constants import ChatAction
-from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, MessageHandler, filters, Application
-
-# 1. Setup Logging immediately to capture startup errors
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.DEBUG, # Changed to DEBUG to trace responsiveness issues
-    handlers=[
-        logging.FileHandler("kernel.log"),
-        logging.StreamHandler()
-    ]
-)
+from telegram.error import BadRequest, TelegramError
+from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler, filters, Application
+
+from src.log_setup import setup_logging
+
+# 1. Setup Logging immediately to capture startup errors.
+# Records are written by a background thread, so logging never blocks the event loop.
+setup_logging("kernel.log")
 logger = logging.getLogger(__name__)
 
 # 2. Add Global Exception Hook
@@ -34,19 +32,85 @@ logger.info("Initializing Kernel Bot...")
 try:
     from src.config import config
     from src.services.brain import brain
+    from src.services.google_suite import google_suite
     from src.services.poller import poller
     from src.services.reporter import reporter
     from src.services.teacher import teacher
+    from src.services.work_queue import work_queue
+    from src.services.router import router
+    from src.services.mail_index import mail_index
+    from src.services.event_log import event_log
+    from src.update_processor import PerChatUpdateProcessor
+    from src.delivery import deliverer
+    from src.reminders import reminders
+    from src.profiler import profiler
+    from src.services.triage_model import triage_model
+    from src.services.prefetcher import prefetcher
 except Exception as e:
     logger.critical(f"Failed to import dependencies: {e}", exc_info=True)
     sys.exit(1)
 
 # Global variable for access control
 ALLOWED_USER_IDS = []
+# When True, chat messages are handed to worker processes through the work queue
+WORKER_MODE = False
 
 async def ping(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("Pong! Kernel is running.")
 
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if ALLOWED_USER_IDS and update.effective_user.id not in ALLOWED_USER_IDS:
+        return
+    cache = google_suite.cache_stats()
+    prefetch = prefetcher.stats()
+    await update.message.reply_text(
+        "Google read cache:\n"
+        f"- Hits: {cache['hits']}\n"
+        f"- Misses: {cache['misses']}\n"
+        f"- Coalesced: {cache['coalesced']}\n"
+        f"- Hit rate: {cache['hit_rate']:.0%}\n"
+        "\nTool prefetching:\n"
+        f"- Used: {prefetch['hits']}\n"
+        f"- Wasted: {prefetch['wasted']}\n"
+        f"- Not predicted: {prefetch['misses']}\n"
+        f"- Precision: {prefetch['precision']:.0%}, recall: {prefetch['recall']:.0%}"
+    )
+
+async def _run_profile(bot, chat_id, seconds):
+    """Profiles the bot process and sends the result files to the chat, if any."""
+    try:
+        paths = await asyncio.get_running_loop().run_in_executor(
+            None, profiler.profile, seconds, asyncio.get_running_loop()
+        )
+    except RuntimeError as e:
+        logger.warning(str(e))
+        if chat_id:
+            await bot.send_message(chat_id=chat_id, text=str(e))
+        return
+    if not chat_id:
+        return
+    for path in paths:
+        with open(path, 'rb') as f:
+            await bot.send_document(chat_id=chat_id, document=f, filename=os.path.basename(path))
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Admin only: the first allowed user. Optional argument: seconds, e.g. /profile 60
+    if not ALLOWED_USER_IDS or update.effective_user.id != ALLOWED_USER_IDS[0]:
+        await update.message.reply_text("Sorry, only the admin can profile the bot.")
+        return
+    try:
+        seconds = int(context.args[0]) if context.args else config.get_setting("profile_default_seconds", 30)
+    except ValueError:
+        seconds = config.get_setting("profile_default_seconds", 30)
+    seconds = max(1, min(seconds, config.get_setting("profile_max_seconds", 300)))
+
+    await update.message.reply_text(f"Profiling for {seconds}s...")
+    try:
+        await _run_profile(context.bot, update.effective_chat.id, seconds)
+    except Exception as e:
+        logger.error(f"Error profiling: {e}", exc_info=True)
+        await update.message.reply_text("I encountered an error while profiling.")
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("Hello! I am Kernel, your personal AI assistant. I can manage your emails, calendar, and tasks. How can I help you today?")
 
@@ -57,6 +121,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "- 'Read my unread emails'\n"
         "- 'Remind me to buy milk'\n"
         "- 'Send an email to boss@example.com saying I will be late'\n"
+        "\nQuick commands: /tasks, /events, /inbox\n"
         "\nI also check your emails and calendar in the background!"
     )
 
@@ -75,17 +140,54 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
 
         user_text = update.message.text
-        logger.info(f"Processing message: {user_text}")
+        logger.info(f"Processing message ({len(user_text)} chars).")
 
-        # Process with Brain
-        response = await asyncio.get_running_loop().run_in_executor(None, brain.process_user_intent, user_text)
+        if WORKER_MODE:
+            await asyncio.get_running_loop().run_in_executor(
+                None, work_queue.enqueue, update.effective_chat.id, 'text',
+                {'text': user_text, 'message_id': update.message.message_id}
+            )
+            return
+
+        # Common requests are answered straight from Google, the rest goes to the Brain
+        response = await asyncio.get_running_loop().run_in_executor(None, router.route, user_text)
+        if response is None:
+            response = await asyncio.get_running_loop().run_in_executor(
+                None, brain.process_user_intent, user_text, update.effective_chat.id
+            )
 
         logger.info("Response generated.")
-        await update.message.reply_text(response)
+        await deliverer.send(update.effective_chat.id, response)
     except Exception as e:
         logger.error(f"Error handling message: {e}", exc_info=True)
         await update.message.reply_text("I encountered an error while processing your message.")
 
+async def _reply_fast_path(update: Update, context: ContextTypes.DEFAULT_TYPE, func, *args):
+    """Runs a Router reply for a slash command and sends it."""
+    if ALLOWED_USER_IDS and update.effective_user.id not in ALLOWED_USER_IDS:
+        await update.message.reply_text("Sorry, you are not authorized to use this bot.")
+        return
+    try:
+        response = await asyncio.get_running_loop().run_in_executor(None, func, *args)
+        await update.message.reply_text(response)
+    except Exception as e:
+        logger.error(f"Error handling command: {e}", exc_info=True)
+        await update.message.reply_text("I encountered an error while processing your command.")
+
+async def tasks_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _reply_fast_path(update, context, router.reply_tasks)
+
+async def events_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Optional argument: hours to look ahead, e.g. /events 48
+    try:
+        hours = int(context.args[0]) if context.args else 24
+    except ValueError:
+        hours = 24
+    await _reply_fast_path(update, context, router.reply_events, hours)
+
+async def inbox_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _reply_fast_path(update, context, router.reply_inbox)
+
 async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     temp_path = None
     try:
@@ -111,11 +213,22 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
         new_file = await context.bot.get_file(voice.file_id)
         await new_file.download_to_drive(temp_path)
 
+        if WORKER_MODE:
+            await asyncio.get_running_loop().run_in_executor(
+                None, work_queue.enqueue, update.effective_chat.id, 'voice',
+                {'path': temp_path, 'message_id': update.message.message_id}
+            )
+            # The worker removes the file once the job is done
+            temp_path = None
+            return
+
         # Process with Brain
-        response = await asyncio.get_running_loop().run_in_executor(None, brain.process_user_voice, temp_path)
+        response = await asyncio.get_running_loop().run_in_executor(
+            None, brain.process_user_voice, temp_path, update.effective_chat.id
+        )
 
         logger.info("Response generated.")
-        await update.message.reply_text(response)
+        await deliverer.send(update.effective_chat.id, response)
     except Exception as e:
         logger.error(f"Error handling voice message: {e}", exc_info=True)
         await update.message.reply_text("I encountered an error while processing your voice message.")
@@ -124,6 +237,41 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if temp_path and os.path.exists(temp_path):
             os.remove(temp_path)
 
+async def deliver_replies(context: ContextTypes.DEFAULT_TYPE):
+    """Sends the replies that worker processes left in the work queue."""
+    replies = await asyncio.get_running_loop().run_in_executor(None, work_queue.fetch_replies)
+    for reply in replies:
+        try:
+            await deliverer.send(
+                reply['chat_id'], reply['text'],
+                reply_to_message_id=reply['reply_to'], allow_sending_without_reply=True
+            )
+        except BadRequest as e:
+            # Retrying will not help, drop it so it does not block the queue
+            logger.error(f"Dropping undeliverable reply {reply['id']}: {e}")
+        except TelegramError as e:
+            logger.warning(f"Failed to deliver reply {reply['id']}, will retry: {e}")
+            return
+        await asyncio.get_running_loop().run_in_executor(None, work_queue.delete_reply, reply['id'])
+
+async def post_init(application: Application):
+    deliverer.start(application.bot)
+
+    # `kill -USR1 <pid>` profiles the bot without going through Telegram
+    def on_sigusr1():
+        seconds = config.get_setting("profile_default_seconds", 30)
+        chat_id = ALLOWED_USER_IDS[0] if ALLOWED_USER_IDS else None
+        asyncio.ensure_future(_run_profile(application.bot, chat_id, seconds))
+
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, on_sigusr1)
+    except (AttributeError, NotImplementedError):
+        # No SIGUSR1 on Windows
+        pass
+
+async def post_shutdown(application: Application):
+    await deliverer.stop()
+
 async def polling_job(context: ContextTypes.DEFAULT_TYPE):
     """Background job to check for updates."""
     # Reload settings to pick up any changes from Dashboard
@@ -135,13 +283,51 @@ async def polling_job(context: ContextTypes.DEFAULT_TYPE):
     chat_id = ALLOWED_USER_IDS[0]
 
     # Run polling in executor to avoid blocking the event loop
+    # Alerts are merged into a digest by the deliverer when several arrive at once
     email_alerts = await asyncio.get_running_loop().run_in_executor(None, poller.poll_emails)
-    for alert in email_alerts:
-        await context.bot.send_message(chat_id=chat_id, text=alert, parse_mode='Markdown')
+    for alert, email_id in email_alerts:
+        # 👍/👎 teach the local triage model
+        buttons = [
+            InlineKeyboardButton("👍", callback_data=f"triage:1:{email_id}"),
+            InlineKeyboardButton("👎", callback_data=f"triage:0:{email_id}")
+        ]
+        deliverer.send_alert(chat_id, alert, buttons=buttons)
+    event_log.record('alerts', source='email', count=len(email_alerts))
+
+    # Snapshot of the Google read cache, charted on the Dashboard's Operations page
+    event_log.record('cache', **google_suite.cache_stats())
+
+async def triage_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Stores a 👍/👎 on an email alert as a training example."""
+    query = update.callback_query
+    if ALLOWED_USER_IDS and query.from_user.id not in ALLOWED_USER_IDS:
+        await query.answer()
+        return
 
-    calendar_alerts = await asyncio.get_running_loop().run_in_executor(None, poller.poll_calendar)
-    for alert in calendar_alerts:
-        await context.bot.send_message(chat_id=chat_id, text=alert, parse_mode='Markdown')
+    _, label, email_id = query.data.split(':', 2)
+    recorded = await asyncio.get_running_loop().run_in_executor(
+        None, triage_model.record_feedback, email_id, label == '1'
+    )
+    await query.answer("Thanks, I'll remember that." if recorded else "I can't find that email anymore.")
+    # A digest has a row per email, only the answered one goes away
+    rows = [
+        row for row in query.message.reply_markup.inline_keyboard
+        if not any(button.callback_data.endswith(f":{email_id}") for button in row)
+    ] if query.message and query.message.reply_markup else []
+    try:
+        await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(rows) if rows else None)
+    except BadRequest:
+        pass
+
+async def mail_index_sync_job(context: ContextTypes.DEFAULT_TYPE):
+    """Keeps the local mail index in sync with Gmail."""
+    await asyncio.get_running_loop().run_in_executor(None, mail_index.sync)
+
+async def prepare_report(context: ContextTypes.DEFAULT_TYPE):
+    """Generates a report a few minutes before it is due, so it goes out on time."""
+    if not ALLOWED_USER_IDS: return
+    part_of_day = context.job.data if context.job.data else "Daily"
+    await asyncio.get_running_loop().run_in_executor(None, reporter.prepare, part_of_day)
 
 async def send_report(context: ContextTypes.DEFAULT_TYPE):
     """Sends a scheduled report."""
@@ -152,8 +338,8 @@ async def send_report(context: ContextTypes.DEFAULT_TYPE):
     part_of_day = job.data if job.data else "Daily"
 
     logger.info(f"Sending {part_of_day} report...")
-    report_text = await asyncio.get_running_loop().run_in_executor(None, reporter.generate_report, part_of_day)
-    await context.bot.send_message(chat_id=chat_id, text=report_text, parse_mode='Markdown')
+    report_text = await asyncio.get_running_loop().run_in_executor(None, reporter.get_report, part_of_day)
+    await deliverer.send(chat_id, report_text, parse_mode='Markdown')
 
 async def run_teacher_job(context: ContextTypes.DEFAULT_TYPE):
     """Sends a scheduled English lesson."""
@@ -162,7 +348,7 @@ async def run_teacher_job(context: ContextTypes.DEFAULT_TYPE):
 
     lesson = await asyncio.get_running_loop().run_in_executor(None, teacher.teach_english)
     if lesson:
-        await context.bot.send_message(chat_id=chat_id, text=lesson, parse_mode='Markdown')
+        await deliverer.send(chat_id, lesson, parse_mode='Markdown')
 
 async def run_word_of_day_job(context: ContextTypes.DEFAULT_TYPE):
     """Sends the daily Word of the Day."""
@@ -172,11 +358,11 @@ async def run_word_of_day_job(context: ContextTypes.DEFAULT_TYPE):
     logger.info("Sending Word of the Day...")
     lesson = await asyncio.get_running_loop().run_in_executor(None, teacher.teach_word_of_the_day)
     if lesson:
-        await context.bot.send_message(chat_id=chat_id, text=lesson, parse_mode='Markdown')
+        await deliverer.send(chat_id, lesson, parse_mode='Markdown')
 
 
 def run_bot():
-    global ALLOWED_USER_IDS
+    global ALLOWED_USER_IDS, WORKER_MODE
 
     # Process configuration securely inside the run function
     raw_allowed_ids = config.get_secret("allowed_telegram_user_ids", [])
@@ -198,17 +384,35 @@ def run_bot():
     else:
         logger.info(f"Bot restricted to {len(ALLOWED_USER_IDS)} users.")
 
+    WORKER_MODE = config.get_setting("worker_processes", 0) > 0
+    if WORKER_MODE:
+        logger.info("Running as ingestion process, chat messages are processed by workers.")
+
     token = config.get_secret("telegram_bot_token")
     if not token or token == "YOUR_TELEGRAM_BOT_TOKEN_HERE":
         logger.error("Telegram Bot Token is missing. Please set it in secrets.json")
         return
 
     try:
-        application = ApplicationBuilder().token(token).build()
+        # Handle updates concurrently: chats run in parallel, each chat stays in order
+        max_in_flight = config.get_setting("max_concurrent_updates", 8)
+        application = ApplicationBuilder() \
+            .token(token) \
+            .concurrent_updates(PerChatUpdateProcessor(max_in_flight)) \
+            .post_init(post_init) \
+            .post_shutdown(post_shutdown) \
+            .build()
 
         application.add_handler(CommandHandler('start', start))
         application.add_handler(CommandHandler('help', help_command))
         application.add_handler(CommandHandler('ping', ping))
+        application.add_handler(CommandHandler('stats', stats))
+        application.add_handler(CommandHandler('tasks', tasks_command))
+        application.add_handler(CommandHandler('events', events_command))
+        application.add_handler(CommandHandler('inbox', inbox_command))
+        # Runs in the background, the chat's later messages must not wait for the whole profile
+        application.add_handler(CommandHandler('profile', profile_command, block=False))
+        application.add_handler(CallbackQueryHandler(triage_feedback, pattern=r'^triage:'))
         application.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), handle_message))
         application.add_handler(MessageHandler(filters.VOICE, handle_voice))
 
@@ -220,14 +424,28 @@ def run_bot():
             job_queue.run_repeating(polling_job, interval=interval, first=10)
             logger.info(f"Polling job scheduled every {interval} seconds.")
 
-            # Schedule reports
-            # Morning (8:00 AM)
-            job_queue.run_daily(send_report, time=datetime.time(hour=8, minute=0), data="Morning")
-            # Noon (12:00 PM)
-            job_queue.run_daily(send_report, time=datetime.time(hour=12, minute=0), data="Noon")
-            # Evening (6:00 PM)
-            job_queue.run_daily(send_report, time=datetime.time(hour=18, minute=0), data="Evening")
-            logger.info("Daily reports scheduled for 08:00, 12:00, and 18:00.")
+            # Calendar reminders: events are loaded periodically, each one gets its own job
+            if ALLOWED_USER_IDS:
+                calendar_interval = config.get_setting("calendar_check_interval_minutes", 60)
+                job_queue.run_repeating(reminders.refresh, interval=calendar_interval * 60, first=5, data=ALLOWED_USER_IDS[0])
+                near_interval = config.get_setting("reminder_near_check_minutes", 5)
+                job_queue.run_repeating(reminders.refresh_soon, interval=near_interval * 60, first=near_interval * 60, data=ALLOWED_USER_IDS[0])
+                logger.info(f"Calendar reminders refreshed every {calendar_interval} minutes, the next ones every {near_interval} minutes.")
+
+            sync_minutes = config.get_setting("mail_index_sync_minutes", 10)
+            job_queue.run_repeating(mail_index_sync_job, interval=sync_minutes * 60, first=30)
+            logger.info(f"Mail index sync scheduled every {sync_minutes} minutes.")
+
+            if WORKER_MODE:
+                job_queue.run_repeating(deliver_replies, interval=config.get_setting("reply_poll_interval_seconds", 1), first=1)
+
+            # Schedule reports, each one prepared a few minutes before it is sent
+            prepare_lead = datetime.timedelta(minutes=config.get_setting("report_prepare_minutes", 5))
+            for hour, part_of_day in [(8, "Morning"), (12, "Noon"), (18, "Evening")]:
+                send_at = datetime.datetime.combine(datetime.date.today(), datetime.time(hour=hour, minute=0))
+                job_queue.run_daily(prepare_report, time=(send_at - prepare_lead).time(), data=part_of_day)
+                job_queue.run_daily(send_report, time=send_at.time(), data=part_of_day)
+            logger.info(f"Daily reports scheduled for 08:00, 12:00, and 18:00 (prepared {prepare_lead} ahead).")
 
             # Schedule English Teacher
             freq_hours = config.get_setting("learning_frequency_hours", 4)
@@ -9,6 +9,24 @@ logger = logging.getLogger(__name__)
 SECRETS_FILE = 'secrets.json'
 SETTINGS_FILE = 'settings.json'
 
+# Which model tier each workload uses, and how long a request may take before
+# falling back to the fast tier. Overridable with the "workload_tiers" and
+# "workload_latency_budget_seconds" settings. Shared by the Brain and the Dashboard.
+DEFAULT_WORKLOAD_TIERS = {
+    'chat': 'smart',
+    'voice': 'smart',
+    'triage': 'fast',
+    'report': 'smart',
+    'lesson': 'fast'
+}
+DEFAULT_LATENCY_BUDGETS = {
+    'chat': 30,
+    'voice': 45,
+    'triage': 10,
+    'report': 60,
+    'lesson': 30
+}
+
 class Config:
     def __init__(self):
         self.secrets = self._load_json(SECRETS_FILE)
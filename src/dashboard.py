@@ -6,7 +6,7 @@ from datetime import datetime
 # Ensure src is in path if running directly
 sys.path.append(os.getcwd())
 
-from src.config import config
+from src.config import config, DEFAULT_WORKLOAD_TIERS, DEFAULT_LATENCY_BUDGETS
 
 st.set_page_config(
     page_title="Kernel Dashboard",
@@ -50,6 +50,33 @@ with st.form("settings_form"):
             help="Note: Changing this requires restarting the bot."
         )
 
+    col5, col6 = st.columns(2)
+    with col5:
+        calendar_interval = st.number_input(
+            "Calendar Refresh (minutes)",
+            min_value=5,
+            max_value=240,
+            value=int(config.get_setting("calendar_check_interval_minutes", 60)),
+            help="How often upcoming events are loaded to schedule reminders. Requires restarting the bot."
+        )
+
+    with col6:
+        reminder_lead = st.number_input(
+            "Reminder Lead Time (minutes)",
+            min_value=0,
+            max_value=120,
+            value=int(config.get_setting("reminder_lead_minutes", 10)),
+            help="How long before an event starts the reminder is sent."
+        )
+
+    worker_processes = st.number_input(
+        "Worker Processes",
+        min_value=0,
+        max_value=16,
+        value=int(config.get_setting("worker_processes", 0)),
+        help="0 runs everything in one process. Above 0, messages are handled by that many worker processes. Requires restarting the bot."
+    )
+
     st.subheader("Brain Configuration")
 
     system_prompt = st.text_area(
@@ -66,6 +93,54 @@ with st.form("settings_form"):
         help="Criteria used by Gemini to decide if an email is important."
     )
 
+    context_caching = st.checkbox(
+        "Enable Gemini Context Caching",
+        value=config.get_setting("gemini_context_caching", True),
+        help="Caches the system prompt and tool definitions on Gemini's side to cut latency and input-token cost. Caches are rebuilt automatically when the prompt or criteria change."
+    )
+
+    st.subheader("Models")
+
+    col7, col8 = st.columns(2)
+    with col7:
+        smart_model = st.text_input(
+            "Smart Model",
+            value=config.get_setting("gemini_model", "gemini-3-flash-preview"),
+            help="Larger model, used for tool-calling chat by default."
+        )
+    with col8:
+        fast_model = st.text_input(
+            "Fast Model",
+            value=config.get_setting("gemini_fast_model", "gemini-2.5-flash-lite"),
+            help="Small, cheap model. Also used as fallback when the smart model times out or runs out of quota."
+        )
+
+    workloads = {
+        "chat": "Chat",
+        "voice": "Voice Notes",
+        "triage": "Email Triage",
+        "report": "Reports",
+        "lesson": "Lessons"
+    }
+    workload_tiers = {**DEFAULT_WORKLOAD_TIERS, **config.get_setting("workload_tiers", {})}
+    workload_budgets = {**DEFAULT_LATENCY_BUDGETS, **config.get_setting("workload_latency_budget_seconds", {})}
+    for key, label in workloads.items():
+        col9, col10 = st.columns(2)
+        with col9:
+            workload_tiers[key] = st.selectbox(
+                f"{label} Model",
+                ["smart", "fast"],
+                index=["smart", "fast"].index(workload_tiers[key])
+            )
+        with col10:
+            workload_budgets[key] = st.number_input(
+                f"{label} Latency Budget (seconds)",
+                min_value=1,
+                max_value=300,
+                value=int(workload_budgets[key]),
+                help="Requests taking longer are retried on the fast model."
+            )
+
     st.subheader("Daily Learning")
 
     col3, col4 = st.columns(2)
@@ -100,8 +175,16 @@ with st.form("settings_form"):
     if submitted:
         config.update_setting("ai_email_filtering", ai_filtering)
         config.update_setting("email_check_interval_minutes", poll_interval)
+        config.update_setting("worker_processes", worker_processes)
+        config.update_setting("calendar_check_interval_minutes", calendar_interval)
+        config.update_setting("reminder_lead_minutes", reminder_lead)
         config.update_setting("system_prompt", system_prompt)
         config.update_setting("importance_criteria", importance_criteria)
+        config.update_setting("gemini_context_caching", context_caching)
+        config.update_setting("gemini_model", smart_model)
+        config.update_setting("gemini_fast_model", fast_model)
+        config.update_setting("workload_tiers", workload_tiers)
+        config.update_setting("workload_latency_budget_seconds", workload_budgets)
 
         config.update_setting("wotd_enabled", wotd_enabled)
         config.update_setting("wotd_time", wotd_time.strftime("%H:%M"))
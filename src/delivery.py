@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import time
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from src.config import config
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+
+class TokenBucket:
+    """Async token bucket. `acquire` waits until a token is available."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """Stops handing out tokens for a while, e.g. after Telegram asked us to back off."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def _hard_wrap(line, limit):
+    """Splits a single line that is longer than `limit`, preferring spaces."""
+    pieces = []
+    while len(line) > limit:
+        cut = line.rfind(' ', 0, limit)
+        if cut <= 0:
+            cut = limit
+        pieces.append(line[:cut])
+        line = line[cut:].lstrip(' ')
+    pieces.append(line)
+    return pieces
+
+def split_text(text, limit=MAX_MESSAGE_LENGTH):
+    """Splits text into Telegram-sized chunks on line boundaries.
+
+    Code blocks cut by a split are closed at the end of the chunk and reopened
+    at the start of the next one, so each chunk is valid Markdown on its own.
+    """
+    if len(text) <= limit:
+        return [text]
+
+    fence = '```'
+    # Leave room for closing and reopening a code block
+    budget = limit - 2 * (len(fence) + 1)
+    chunks = []
+    current = []
+    current_len = 0
+    in_code = False
+
+    for line in text.split('\n'):
+        for piece in _hard_wrap(line, budget):
+            if current and current_len + len(piece) + 1 > budget:
+                chunks.append('\n'.join(current + ([fence] if in_code else [])))
+                current = [fence] if in_code else []
+                current_len = len(fence) + 1 if in_code else 0
+            current.append(piece)
+            current_len += len(piece) + 1
+            if piece.count(fence) % 2 == 1:
+                in_code = not in_code
+
+    if current:
+        chunks.append('\n'.join(current))
+    return [c for c in chunks if c.strip()]
+
+class Deliverer:
+    """Sends outgoing Telegram messages within Telegram's rate limits.
+
+    Each chat has its own queue, so messages to a chat keep their order.
+    Sending is throttled by a global and a per-chat token bucket, long texts
+    are split, bursts of alerts are merged into one digest, and flood-control
+    errors are retried after the delay Telegram asks for.
+    """
+
+    def __init__(self):
+        self.bot = None
+        self._queues = {}
+        self._workers = {}
+        self._chat_buckets = {}
+        self._pending_alerts = {}
+        self._alert_flushes = {}
+        self._global_bucket = None
+
+    def start(self, bot):
+        self.bot = bot
+        self._global_bucket = TokenBucket(
+            rate=config.get_setting("telegram_global_rate_per_second", 30),
+            capacity=config.get_setting("telegram_global_rate_per_second", 30)
+        )
+
+    async def stop(self):
+        for task in list(self._alert_flushes.values()) + list(self._workers.values()):
+            task.cancel()
+        self._alert_flushes.clear()
+        self._workers.clear()
+        self._queues.clear()
+
+    async def send(self, chat_id, text, parse_mode=None, **kwargs):
+        """Queues a message for a chat and waits until all of its parts are sent."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue_for(chat_id).put_nowait((text, parse_mode, kwargs, future))
+        return await future
+
+    def send_alert(self, chat_id, text, parse_mode='Markdown', buttons=None):
+        """Queues an alert. Alerts arriving close together are sent as one digest.
+
+        `buttons` is an optional row of InlineKeyboardButtons for this alert.
+        In a digest the alerts are numbered and each one keeps its own row,
+        labelled with its number.
+        """
+        self._pending_alerts.setdefault(chat_id, []).append((text, buttons))
+        if chat_id not in self._alert_flushes:
+            self._alert_flushes[chat_id] = asyncio.create_task(self._flush_alerts(chat_id, parse_mode))
+
+    async def _flush_alerts(self, chat_id, parse_mode):
+        await asyncio.sleep(config.get_setting("alert_coalesce_seconds", 3))
+        del self._alert_flushes[chat_id]
+        alerts = self._pending_alerts.pop(chat_id, [])
+        if not alerts:
+            return
+        if len(alerts) == 1:
+            text, buttons = alerts[0]
+            rows = [buttons] if buttons else []
+        else:
+            text = f"🔔 *{len(alerts)} new alerts*\n\n" + "\n\n".join(
+                f"{n}. {alert}" for n, (alert, _) in enumerate(alerts, 1)
+            )
+            rows = [
+                [InlineKeyboardButton(f"{n}. {button.text}", callback_data=button.callback_data) for button in buttons]
+                for n, (_, buttons) in enumerate(alerts, 1) if buttons
+            ]
+        extra = {'reply_markup': InlineKeyboardMarkup(rows)} if rows else {}
+        try:
+            await self.send(chat_id, text, parse_mode=parse_mode, **extra)
+        except Exception as e:
+            logger.error(f"Failed to send alerts to {chat_id}: {e}")
+
+    def _queue_for(self, chat_id):
+        if chat_id not in self._queues:
+            self._queues[chat_id] = asyncio.Queue()
+            self._chat_buckets[chat_id] = TokenBucket(
+                rate=config.get_setting("telegram_chat_rate_per_second", 1),
+                capacity=3
+            )
+            self._workers[chat_id] = asyncio.create_task(self._chat_worker(chat_id))
+        return self._queues[chat_id]
+
+    async def _chat_worker(self, chat_id):
+        queue = self._queues[chat_id]
+        while True:
+            text, parse_mode, kwargs, future = await queue.get()
+            try:
+                sent = []
+                chunks = split_text(text)
+                for i, chunk in enumerate(chunks):
+                    # Only the first part is a reply, only the last one carries buttons
+                    extra = dict(kwargs)
+                    if i > 0:
+                        extra.pop('reply_to_message_id', None)
+                    if i < len(chunks) - 1:
+                        extra.pop('reply_markup', None)
+                    sent.append(await self._send_chunk(chat_id, chunk, parse_mode, extra))
+                if not future.done():
+                    future.set_result(sent)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _send_chunk(self, chat_id, text, parse_mode, kwargs):
+        max_retries = config.get_setting("telegram_send_retries", 5)
+        for attempt in range(max_retries):
+            await self._chat_buckets[chat_id].acquire()
+            await self._global_bucket.acquire()
+            try:
+                return await self.bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode, **kwargs)
+            except RetryAfter as e:
+                logger.warning(f"Flood control hit, retrying in {e.retry_after}s.")
+                # Flood control applies to the whole bot, hold every chat back
+                self._global_bucket.pause(float(e.retry_after))
+            except BadRequest as e:
+                if parse_mode and "parse entities" in str(e).lower():
+                    logger.warning(f"Markdown rejected by Telegram, sending as plain text: {e}")
+                    parse_mode = None
+                    continue
+                raise
+            except NetworkError as e:
+                if attempt == max_retries - 1:
+                    raise
+                logger.warning(f"Network error sending message, retrying: {e}")
+                await asyncio.sleep(2 ** attempt)
+        raise RuntimeError(f"Giving up on message to {chat_id} after {max_retries} attempts.")
+
+deliverer = Deliverer()
@@ -0,0 +1,172 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+# Noisy third-party loggers: below WARNING only a sample of their records is
+# kept, and at most `per_second` of those (with bursts up to `burst`).
+DEFAULT_LOG_LIMITS = {
+    "httpx": {"sample": 0.1, "per_second": 1, "burst": 5},
+    "httpcore": {"sample": 0.0},
+    "googleapiclient": {"sample": 0.1, "per_second": 1, "burst": 5},
+    "google_auth_httplib2": {"sample": 0.0},
+    "telegram": {"sample": 1.0, "per_second": 2, "burst": 10},
+}
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'process': record.processName,
+            'pid': record.process,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class NoisyLoggerFilter(logging.Filter):
+    """Samples and rate limits records from the loggers in `limits`.
+
+    Keys are logger names and also match their children ("googleapiclient"
+    covers "googleapiclient.discovery"). WARNING and above always pass.
+    """
+
+    def __init__(self, limits):
+        super().__init__()
+        self.limits = limits
+        self._state = {}  # logger prefix -> [sample counter, tokens, last refill]
+        self._lock = threading.Lock()
+
+    def _prefix(self, name):
+        while name:
+            if name in self.limits:
+                return name
+            name = name.rpartition('.')[0]
+        return None
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        prefix = self._prefix(record.name)
+        if prefix is None:
+            return True
+
+        limit = self.limits[prefix]
+        sample = limit.get("sample", 1.0)
+        if sample <= 0:
+            return False
+
+        with self._lock:
+            now = time.monotonic()
+            state = self._state.setdefault(prefix, [0.0, limit.get("burst", 1), now])
+            # Deterministic sampling: keep every 1/sample-th record
+            state[0] += sample
+            if state[0] < 1:
+                return False
+            state[0] -= 1
+
+            per_second = limit.get("per_second")
+            if per_second is None:
+                return True
+            state[1] = min(limit.get("burst", 1), state[1] + (now - state[2]) * per_second)
+            state[2] = now
+            if state[1] < 1:
+                return False
+            state[1] -= 1
+            return True
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread without ever blocking the caller.
+
+    Formatting (including tracebacks) is left to the listener thread. When the
+    queue is full, records are dropped and counted instead of waiting.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Freeze the message now since its arguments may change later,
+        # but leave the traceback to be formatted off the caller's thread.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self.dropped:
+                dropped = logging.makeLogRecord({
+                    'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f"Dropped {self.dropped} log records, the log queue was full."
+                })
+                self.queue.put_nowait(dropped)
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener = None
+
+def setup_logging(log_file="kernel.log"):
+    """Routes all logging through a background thread.
+
+    Callers only put records on an in-memory queue. A listener thread writes
+    them as JSON lines to a size-rotated `log_file` and as text to the console.
+    Only the first call has an effect.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    # Imported here: config logs while loading, which should already be captured
+    from src.config import config
+
+    level = getattr(logging, str(config.get_setting("log_level", "INFO")).upper(), logging.INFO)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file,
+        maxBytes=config.get_setting("log_max_mb", 10) * 1024 * 1024,
+        backupCount=config.get_setting("log_backup_count", 5),
+        encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(
+        '%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+    ))
+
+    log_queue = queue.Queue(maxsize=config.get_setting("log_queue_size", 10000))
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(NoisyLoggerFilter({**DEFAULT_LOG_LIMITS, **config.get_setting("log_limits", {})}))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+    _listener.start()
+    # Flush whatever is still queued on exit
+    atexit.register(_listener.stop)
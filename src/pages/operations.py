@@ -0,0 +1,178 @@
+import streamlit as st
+import pandas as pd
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Ensure src is in path if running directly
+sys.path.append(os.getcwd())
+
+from src.services.event_log import EVENT_LOG_FILE, event_log_files
+
+st.set_page_config(
+    page_title="Kernel Operations",
+    page_icon="📈",
+    layout="wide"
+)
+
+st.title("📈 Operations")
+st.markdown("Latency, usage and cost trends from the bot's event log.")
+
+# The log is append-only, so everything before the last chunk never changes.
+# Parsing it in fixed-size chunks lets Streamlit's cache reuse all complete
+# chunks and only re-read the tail on each refresh.
+CHUNK_BYTES = 1024 * 1024
+# A chunk only counts as complete once the file has grown this far past it,
+# so a line still being written across the boundary is never cached half-read
+CHUNK_MARGIN = 64 * 1024
+
+@st.cache_data(show_spinner=False, max_entries=2000)
+def load_chunk(path, inode, index, end):
+    """Parses the events whose line starts inside chunk `index`, reading at most up to `end`."""
+    start = index * CHUNK_BYTES
+    records = []
+    with open(path, 'rb') as f:
+        if start > 0:
+            # Skip the rest of the line that started in the previous chunk
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() <= min(start + CHUNK_BYTES - 1, end - 1):
+            line = f.readline()
+            if not line.endswith(b'\n'):
+                # Line still being written
+                break
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+def load_events(path):
+    if not os.path.exists(path):
+        return []
+    stat = os.stat(path)
+    records = []
+    for index in range(stat.st_size // CHUNK_BYTES + 1):
+        # Complete chunks are cached forever, the last one is keyed by the current size
+        complete = (index + 1) * CHUNK_BYTES + CHUNK_MARGIN <= stat.st_size
+        end = (index + 1) * CHUNK_BYTES if complete else stat.st_size
+        records.extend(load_chunk(path, stat.st_ino, index, end))
+    return records
+
+@st.cache_data(show_spinner=False, max_entries=20)
+def to_frames(records_key, _records):
+    """Splits events by kind into DataFrames indexed by local time.
+
+    `_records` is not hashed by Streamlit (leading underscore); `records_key` identifies it.
+    """
+    frames = {}
+    df = pd.DataFrame.from_records(_records)
+    if df.empty:
+        return frames
+    local_tz = datetime.now().astimezone().tzinfo
+    df['time'] = pd.to_datetime(df['ts'], unit='s', utc=True).dt.tz_convert(local_tz).dt.tz_localize(None)
+    for kind, group in df.groupby('kind'):
+        frames[kind] = group.dropna(axis=1, how='all').set_index('time').sort_index()
+    return frames
+
+# The bot and each worker write their own file
+files = event_log_files()
+records = [record for path in files for record in load_events(path)]
+if not records:
+    st.info(f"No events yet. The bot writes them to `{EVENT_LOG_FILE}` while it runs.")
+    st.stop()
+
+frames = to_frames((len(records), records[-1]['ts']), records)
+
+col1, col2 = st.columns(2)
+with col1:
+    window = st.selectbox("Time Range", ["Last 24 hours", "Last 7 days", "Last 30 days"], index=1)
+with col2:
+    bucket = st.selectbox("Resolution", ["15min", "1h", "1D"], index=1)
+
+since = datetime.now() - {"Last 24 hours": timedelta(days=1), "Last 7 days": timedelta(days=7), "Last 30 days": timedelta(days=30)}[window]
+frames = {kind: df[df.index >= since].copy() for kind, df in frames.items()}
+
+def p95(series):
+    return series.quantile(0.95)
+
+# --- LLM ---
+st.subheader("Gemini")
+llm = frames.get('llm')
+if llm is not None and not llm.empty:
+    for column in ['input_tokens', 'cached_tokens', 'output_tokens']:
+        if column not in llm:
+            llm[column] = 0
+    llm = llm.fillna({'input_tokens': 0, 'cached_tokens': 0, 'output_tokens': 0})
+    llm['uncached_tokens'] = llm['input_tokens'] - llm['cached_tokens']
+
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Calls", len(llm))
+    m2.metric("Input Tokens", f"{int(llm['input_tokens'].sum()):,}")
+    m3.metric("Cached Share", f"{llm['cached_tokens'].sum() / max(llm['input_tokens'].sum(), 1):.0%}")
+    m4.metric("p95 Latency", f"{p95(llm['latency_ms']) / 1000:.1f}s")
+
+    st.caption("Tokens")
+    st.area_chart(llm[['uncached_tokens', 'cached_tokens', 'output_tokens']].resample(bucket).sum())
+
+    st.caption("p95 latency by workload (ms)")
+    st.line_chart(llm.groupby('workload')['latency_ms'].resample(bucket).apply(p95).unstack(0))
+
+    st.caption("Calls by model")
+    st.bar_chart(llm.groupby('model')['latency_ms'].resample(bucket).count().unstack(0))
+else:
+    st.write("No Gemini calls in this range.")
+
+# --- Google APIs ---
+st.subheader("Google APIs")
+api = frames.get('api')
+if api is not None and not api.empty:
+    summary = api.groupby('method')['latency_ms'].agg(calls='count', p50='median', p95=p95)
+    summary['errors'] = api[api['status'] != 200].groupby('method').size()
+    st.dataframe(summary.fillna({'errors': 0}).sort_values('p95', ascending=False), use_container_width=True)
+
+    st.caption("p95 latency by method (ms)")
+    st.line_chart(api.groupby('method')['latency_ms'].resample(bucket).apply(p95).unstack(0))
+else:
+    st.write("No Google API calls in this range.")
+
+cache = frames.get('cache')
+if cache is not None and not cache.empty:
+    st.caption("Read cache hit rate")
+    st.line_chart(cache['hit_rate'].resample(bucket).last())
+
+# --- Polling and alerts ---
+st.subheader("Polling & Alerts")
+poll = frames.get('poll')
+if poll is not None and not poll.empty:
+    c1, c2 = st.columns(2)
+    with c1:
+        st.caption("Poll cycle duration (s)")
+        st.line_chart((poll['duration_ms'] / 1000).resample(bucket).max())
+    with c2:
+        st.caption("Emails triaged")
+        st.bar_chart(poll['emails'].resample(bucket).sum())
+
+triage = frames.get('triage')
+if triage is not None and not triage.empty:
+    c1, c2 = st.columns(2)
+    with c1:
+        st.caption("Triage decisions: local model vs Gemini")
+        st.bar_chart(triage.groupby('source')['latency_ms'].resample(bucket).count().unstack(0))
+    with c2:
+        st.caption("p95 triage latency by source (ms)")
+        st.line_chart(triage.groupby('source')['latency_ms'].resample(bucket).apply(p95).unstack(0))
+
+prefetch = frames.get('prefetch')
+if prefetch is not None and not prefetch.empty:
+    st.caption("Tool prefetches used vs wasted")
+    st.bar_chart(prefetch[['hits', 'wasted']].resample(bucket).sum())
+
+alerts = frames.get('alerts')
+if alerts is not None and not alerts.empty:
+    st.caption("Alerts sent")
+    st.bar_chart(alerts.groupby('source')['count'].resample(bucket).sum().unstack(0))
+
+st.markdown("---")
+st.caption(f"{len(records):,} events loaded from {', '.join(files)}.")
@@ -0,0 +1,180 @@
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+from src.config import config
+
+logger = logging.getLogger(__name__)
+
+PROFILES_DIR = 'profiles'
+
+# Leaf frames of threads that are just waiting for work, left out of the CPU profile
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('selectors.py', 'select'),
+    ('queue.py', 'get'),
+    # Idle executor threads block in C code called from here
+    ('thread.py', '_worker'),
+}
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+class Profiler:
+    """On-demand sampling profiler for the whole process.
+
+    For the duration of a profile it samples the stacks of every thread
+    (including the executor threads running Google and Gemini calls) via
+    `sys._current_frames`, measures how late the event loop runs callbacks,
+    and traces memory allocations with tracemalloc. When no profile is
+    running nothing is installed, so it costs nothing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = False
+
+    def profile(self, seconds, loop=None):
+        """Profiles for `seconds` and returns the paths of the files written.
+
+        Blocks the calling thread (which is left out of the samples). Pass the
+        asyncio loop to also measure its lag. Raises RuntimeError if a profile
+        is already running.
+        """
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A profile is already running.")
+            self.running = True
+        try:
+            return self._profile(seconds, loop)
+        finally:
+            self.running = False
+
+    def _profile(self, seconds, loop):
+        interval = config.get_setting("profile_sample_interval_ms", 10) / 1000
+        lag_interval = config.get_setting("profile_lag_probe_ms", 100) / 1000
+        logger.info(f"Profiling for {seconds}s...")
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(config.get_setting("profile_traceback_frames", 10))
+        first_snapshot = tracemalloc.take_snapshot()
+
+        me = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        lags = []
+        probe = {'pending': False}
+
+        def probe_done(scheduled):
+            lags.append(time.monotonic() - scheduled)
+            probe['pending'] = False
+
+        end = time.monotonic() + seconds
+        next_probe = 0.0
+        while time.monotonic() < end:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stacks[(names.get(ident, str(ident)), *reversed(stack))] += 1
+            samples += 1
+
+            # One probe in flight at a time: the delay until the loop runs it is the lag
+            now = time.monotonic()
+            if loop is not None and not probe['pending'] and now >= next_probe:
+                probe['pending'] = True
+                next_probe = now + lag_interval
+                loop.call_soon_threadsafe(probe_done, now)
+            time.sleep(interval)
+
+        last_snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        base = os.path.join(PROFILES_DIR, f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+
+        # Collapsed stacks, readable by flamegraph.pl and speedscope
+        with open(base + '.folded', 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        with open(base + '.txt', 'w') as f:
+            f.write(f"Profile of pid {os.getpid()}: {seconds}s, {samples} sampling rounds every {interval * 1000:.0f}ms\n")
+            f.write(self._cpu_summary(stacks))
+            f.write(self._lag_summary(lags, loop))
+            f.write(self._memory_summary(first_snapshot, last_snapshot, current, peak))
+
+        logger.info(f"Profile written to {base}.txt")
+        return [base + '.txt', base + '.folded']
+
+    def _cpu_summary(self, stacks):
+        total = sum(stacks.values())
+        lines = ["\n== CPU (wall-clock samples of busy threads) ==\n"]
+        if not total:
+            lines.append("No busy threads were sampled.\n")
+            return ''.join(lines)
+
+        by_thread, own, inclusive = Counter(), Counter(), Counter()
+        for stack, count in stacks.items():
+            by_thread[stack[0]] += count
+            own[stack[-1]] += count
+            for func in set(stack[1:]):
+                inclusive[func] += count
+
+        lines.append("\nSamples by thread:\n")
+        for name, count in by_thread.most_common():
+            lines.append(f"{count:8d} {count / total:6.1%}  {name}\n")
+        lines.append("\nTop functions (including callees):\n")
+        for func, count in inclusive.most_common(25):
+            lines.append(f"{count:8d} {count / total:6.1%}  {func}\n")
+        lines.append("\nTop functions (own time):\n")
+        for func, count in own.most_common(25):
+            lines.append(f"{count:8d} {count / total:6.1%}  {func}\n")
+        return ''.join(lines)
+
+    def _lag_summary(self, lags, loop):
+        if loop is None:
+            return ""
+        lines = ["\n== Event loop lag ==\n"]
+        if not lags:
+            lines.append("The event loop ran no probes, it was blocked the whole time.\n")
+            return ''.join(lines)
+        ms = [lag * 1000 for lag in lags]
+        lines.append(
+            f"Probes: {len(ms)}, mean {sum(ms) / len(ms):.1f}ms, p50 {_percentile(ms, 0.5):.1f}ms, "
+            f"p95 {_percentile(ms, 0.95):.1f}ms, max {max(ms):.1f}ms, over 100ms: {sum(m > 100 for m in ms)}\n"
+        )
+        return ''.join(lines)
+
+    def _memory_summary(self, first_snapshot, last_snapshot, current, peak):
+        lines = [
+            "\n== Memory (tracemalloc, allocations made while profiling) ==\n",
+            f"Traced: {current / 1024 / 1024:.1f} MiB now, {peak / 1024 / 1024:.1f} MiB peak\n",
+            "\nLargest growth:\n"
+        ]
+        for stat in last_snapshot.compare_to(first_snapshot, 'lineno')[:20]:
+            lines.append(f"{stat}\n")
+        lines.append("\nLargest live allocations:\n")
+        for stat in last_snapshot.statistics('traceback')[:5]:
+            lines.append(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+            lines.extend(f"    {line}\n" for line in stat.traceback.format())
+        return ''.join(lines)
+
+profiler = Profiler()
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from telegram.ext import ContextTypes
+
+from src.config import config
+from src.delivery import deliverer
+from src.services.google_suite import google_suite
+from src.services.event_log import event_log
+
+logger = logging.getLogger(__name__)
+
+def _parse_start(start):
+    """Returns the start of a timed event as an aware datetime, or None for all-day events."""
+    if 'T' not in start:
+        return None
+    try:
+        dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.astimezone()
+
+class ReminderScheduler:
+    """Schedules one job per upcoming calendar event, fired a fixed lead time before it starts.
+
+    `refresh` runs periodically, loads the events of the next period and
+    schedules, moves or cancels the reminder jobs to match the calendar.
+    `refresh_soon` does the same every few minutes for the events about to
+    start, so late changes still get their reminder.
+    """
+
+    def __init__(self):
+        self.scheduled = {}  # event id -> (start, job)
+        self.sent = {}  # (event id, start) -> start datetime, so a reminder is never sent twice
+
+    async def refresh(self, context: ContextTypes.DEFAULT_TYPE):
+        """Reschedules the reminders of the events before the next refresh."""
+        interval = config.get_setting("calendar_check_interval_minutes", 60)
+        lead = config.get_setting("reminder_lead_minutes", 10)
+        # Look a little past the next refresh so nothing falls between two refreshes
+        await self._refresh(context, (interval + lead + 15) / 60)
+
+    async def refresh_soon(self, context: ContextTypes.DEFAULT_TYPE):
+        """Reschedules the reminders due soon. Runs often, so events created or moved shortly before they start are caught."""
+        interval = config.get_setting("reminder_near_check_minutes", 5)
+        lead = config.get_setting("reminder_lead_minutes", 10)
+        await self._refresh(context, (interval + lead + 5) / 60)
+
+    async def _refresh(self, context, hours):
+        chat_id = context.job.data
+        lead = timedelta(minutes=config.get_setting("reminder_lead_minutes", 10))
+        try:
+            events = await asyncio.get_running_loop().run_in_executor(None, google_suite.load_upcoming_events, hours)
+        except Exception as e:
+            # An unreadable calendar is not an empty one, keep what is scheduled
+            logger.error(f"Failed to load calendar events, keeping the scheduled reminders: {e}")
+            return
+        now = datetime.now(timezone.utc)
+        seen = set()
+
+        for event in events:
+            start = _parse_start(event['start'])
+            if start is None:
+                continue
+            seen.add(event['id'])
+
+            existing = self.scheduled.get(event['id'])
+            if existing and existing[0] == start:
+                # Keep the reminder text current, e.g. after a rename
+                existing[1].data['event'] = event
+                continue
+            if existing:
+                logger.info(f"Event {event['id']} moved, rescheduling its reminder.")
+                existing[1].schedule_removal()
+                del self.scheduled[event['id']]
+
+            if (event['id'], event['start']) in self.sent:
+                continue
+
+            when = max(start - lead, now)
+            job = context.job_queue.run_once(
+                self.remind, when=when, name=f"reminder:{event['id']}",
+                data={'chat_id': chat_id, 'event': event}
+            )
+            self.scheduled[event['id']] = (start, job)
+
+        # Events that disappeared from the window were deleted (or moved far away)
+        horizon = now + timedelta(hours=hours)
+        for event_id in [e for e, (start, _) in self.scheduled.items() if e not in seen and start <= horizon]:
+            logger.info(f"Event {event_id} is gone, cancelling its reminder.")
+            self.scheduled.pop(event_id)[1].schedule_removal()
+
+        # Forget sent reminders of events that are long over
+        cutoff = now - timedelta(days=1)
+        self.sent = {key: start for key, start in self.sent.items() if start > cutoff}
+        logger.info(f"Reminders refreshed: {len(self.scheduled)} scheduled.")
+
+    async def remind(self, context: ContextTypes.DEFAULT_TYPE):
+        chat_id = context.job.data['chat_id']
+        event = context.job.data['event']
+        start = _parse_start(event['start'])
+
+        self.scheduled.pop(event['id'], None)
+        self.sent[(event['id'], event['start'])] = start
+
+        time_display = start.astimezone().strftime("%H:%M")
+        minutes = max(0, round((start - datetime.now(timezone.utc)).total_seconds() / 60))
+        event_log.record('alerts', source='calendar', count=1)
+        deliverer.send_alert(
+            chat_id,
+            f"📅 **Upcoming Event**\n{event['summary']}\nAt: {time_display} (in {minutes} min)\n[Link]({event['link']})"
+        )
+
+reminders = ReminderScheduler()
@@ -1,25 +1,104 @@
 import google.generativeai as genai
-from src.config import config
+from google.generativeai import caching
+from google.api_core import exceptions as google_exceptions
+from src.config import config, DEFAULT_WORKLOAD_TIERS, DEFAULT_LATENCY_BUDGETS
 from src.services.google_suite import google_suite
+from src.services.mail_index import mail_index
+from src.services.event_log import event_log
+from src.services.prefetcher import prefetcher
 import logging
 import json
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 
 logger = logging.getLogger(__name__)
 
+TRIAGE_INSTRUCTION = """
+Analyze emails and decide if they are IMPORTANT based on this criteria: "{criteria}".
+
+Respond with valid JSON only: {{ "important": boolean, "reason": "short explanation" }}
+"""
+
+# Tool calling rounds allowed for one user message before we stop and return the answer so far
+MAX_TOOL_ROUNDS = 10
+
+DEFAULT_MODEL = 'gemini-3-flash-preview'
+DEFAULT_FAST_MODEL = 'gemini-2.5-flash-lite'
+
+# Errors after which a request is retried on the fast tier
+FALLBACK_ERRORS = (
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    TimeoutError
+)
+
 class Brain:
     def __init__(self):
         self.api_key = config.get_secret("gemini_api_key")
+        self.tools = self._build_tools()
+        self._tool_functions = {func.__name__: func for func in self.tools}
+        # Models and their Gemini cached contents by (role, model name), and the settings they were built from
+        self._models = {}
+        self._caches = {}
+        self._fingerprint = None
+        self._lock = threading.RLock()
+        # Conversation history per Telegram chat. Kept apart from the models so a
+        # chat can continue on another tier.
+        self.histories = {}
+
+        # Models and caches are created on the first request (see `_run`), importing
+        # the Brain makes no network calls
         if self.api_key:
             genai.configure(api_key=self.api_key)
-            self.model = self._setup_model()
-            self.chat = self.model.start_chat(enable_automatic_function_calling=True)
         else:
             logger.warning("Gemini API Key not found. Brain will not function.")
-            self.model = None
-            self.chat = None
 
-    def _setup_model(self):
+    def _tier_model_name(self, tier):
+        if tier == 'fast':
+            return config.get_setting("gemini_fast_model") or DEFAULT_FAST_MODEL
+        return config.get_setting("gemini_model") or DEFAULT_MODEL
+
+    def _workload_settings(self, workload):
+        """Returns (model name, latency budget in seconds) for a workload."""
+        tier = config.get_setting("workload_tiers", {}).get(workload, DEFAULT_WORKLOAD_TIERS.get(workload, 'smart'))
+        budget = config.get_setting("workload_latency_budget_seconds", {}).get(workload, DEFAULT_LATENCY_BUDGETS.get(workload, 60))
+        return self._tier_model_name(tier), budget
+
+    def _get_model(self, role, model_name):
+        with self._lock:
+            key = (role, model_name)
+            if key not in self._models:
+                if role == 'triage':
+                    instruction = TRIAGE_INSTRUCTION.format(criteria=config.get_setting("importance_criteria"))
+                    self._models[key] = self._create_model(key, model_name, instruction)
+                elif role == 'writer':
+                    # No tools: Gemini rejects JSON mode alongside function declarations
+                    self._models[key] = self._create_model(key, model_name, config.get_setting("system_prompt") or None)
+                else:
+                    self._models[key] = self._create_model(key, model_name, self._system_instruction(), self.tools)
+            return self._models[key]
+
+    def _run(self, workload, role, call):
+        """Runs `call(model, request_options)` on the workload's model within its latency budget.
+
+        On timeout or quota errors the call is retried once on the fast tier,
+        unless `call` already had side effects (see `_send`).
+        """
+        self._ensure_models()
+        model_name, budget = self._workload_settings(workload)
+        request_options = {'timeout': budget}
+        try:
+            return call(self._get_model(role, model_name), request_options)
+        except FALLBACK_ERRORS as e:
+            fast_model_name = self._tier_model_name('fast')
+            if fast_model_name == model_name or getattr(e, 'no_fallback', False):
+                raise
+            logger.warning(f"{workload} on {model_name} failed ({type(e).__name__}), falling back to {fast_model_name}.")
+            return call(self._get_model(role, fast_model_name), request_options)
+
+    def _build_tools(self):
         # Define the tools available to the model
         # We wrap google_suite methods to ensure they have good docstrings for the model
 
@@ -45,6 +124,39 @@ class Brain:
             """
             return google_suite.add_task(title, notes, due_date_iso, urgency)
 
+        def _nth(values, i):
+            """Returns the i-th value of an optional per-item list, or None."""
+            return values[i] or None if values and i < len(values) else None
+
+        def add_todo_tasks(titles: list[str], notes: list[str] = None, due_dates_iso: list[str] = None, urgencies: list[str] = None):
+            """Adds several tasks to the user's Google Tasks at once. Use this instead of add_todo_task whenever there is more than one task.
+
+            Args:
+                titles: The content of each task.
+                notes: Additional details for each task, in the same order as titles. Use an empty string for none.
+                due_dates_iso: The due date of each task in ISO 8601 format (RFC 3339), in the same order as titles. Use an empty string for none.
+                urgencies: 'urgent' or 'high' for each urgent task, in the same order as titles. Use an empty string for normal tasks.
+            """
+            return google_suite.add_tasks([
+                {'title': title, 'notes': _nth(notes, i), 'due_date_iso': _nth(due_dates_iso, i), 'urgency': _nth(urgencies, i)}
+                for i, title in enumerate(titles)
+            ])
+
+        def create_calendar_events(summaries: list[str], start_times_iso: list[str], end_times_iso: list[str] = None, descriptions: list[str] = None):
+            """Creates several events in the user's primary calendar at once. Use this instead of create_calendar_event whenever there is more than one event.
+
+            Args:
+                summaries: The title of each event.
+                start_times_iso: The start time of each event in ISO 8601 format (e.g. '2023-10-27T10:00:00'), in the same order as summaries.
+                end_times_iso: The end time of each event in ISO 8601 format, in the same order as summaries. Use an empty string to default to 1 hour after start.
+                descriptions: A description for each event, in the same order as summaries. Use an empty string for none.
+            """
+            return google_suite.create_events([
+                {'summary': summary, 'start_time_iso': _nth(start_times_iso, i),
+                 'end_time_iso': _nth(end_times_iso, i), 'description': _nth(descriptions, i)}
+                for i, summary in enumerate(summaries)
+            ])
+
         def list_todo_tasks(limit: int = 10):
             """Lists the user's tasks from Google Tasks.
 
@@ -67,10 +179,20 @@ class Brain:
             """Lists the most recent unread emails.
 
             Args:
-                limit: The max number of emails to retrieve (default 5).
+                limit: The max number of emails to retrieve (default 5). Larger values reach further back into older unread mail.
             """
             return google_suite.list_unread_emails(limit)
 
+        def search_emails(query: str, limit: int = 5):
+            """Searches all of the user's recent emails (read and unread) by keywords, sender or topic.
+            Use this to answer questions about past emails, e.g. 'what did my landlord say last week'.
+
+            Args:
+                query: Keywords to search for, such as a sender name, company or subject words.
+                limit: The max number of emails to return (default 5).
+            """
+            return mail_index.search(query, limit)
+
         def list_upcoming_events(hours: int = 24):
             """Lists calendar events occurring in the next X hours.
 
@@ -85,45 +207,213 @@ class Brain:
 
         tools = [
             create_calendar_event,
+            create_calendar_events,
             add_todo_task,
+            add_todo_tasks,
             list_todo_tasks,
             send_email,
             list_unread_emails,
+            search_emails,
             list_upcoming_events,
             get_current_time
         ]
+        return tools
 
+    def _system_instruction(self):
         system_instruction = config.get_setting("system_prompt") or ""
         # Append tool usage instructions
         system_instruction += "\n\nYou have access to tools to manage the user's digital life. " \
                               "When asked to schedule or remind, use the appropriate tool. " \
                               "For tasks, you can set urgency and due times (reminders). " \
+                              "When the user lists several tasks or events, add them all with one add_todo_tasks or create_calendar_events call. " \
                               "Always check the current time using get_current_time if you need to schedule something relatively (like 'tomorrow')."
+        return system_instruction
+
+    def _cache_ttl(self):
+        return timedelta(minutes=config.get_setting("gemini_cache_ttl_minutes", 60))
+
+    def _ensure_models(self):
+        """Drops the models (and their caches) when the settings they were built from change.
+
+        Gemini calls are made outside the lock, other requests only wait for the bookkeeping.
+        """
+        fingerprint = (
+            config.get_setting("system_prompt"),
+            config.get_setting("importance_criteria"),
+            config.get_setting("gemini_model"),
+            config.get_setting("gemini_fast_model"),
+            config.get_setting("gemini_context_caching", True)
+        )
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                caches = dict(self._caches)
+                old_caches = {}
+            else:
+                if self._fingerprint is not None:
+                    logger.info("Brain settings changed, rebuilding models.")
+                caches = {}
+                old_caches = self._caches
+                self._caches = {}
+                self._models = {}
+                self._fingerprint = fingerprint
+
+        self._delete_caches(old_caches)
+        self._refresh_caches(caches)
+
+    def _create_model(self, key, model_name, system_instruction, tools=None):
+        """Creates a model whose system instruction and tools are served from a Gemini cache when possible."""
+        if config.get_setting("gemini_context_caching", True):
+            try:
+                cache = caching.CachedContent.create(
+                    model=model_name,
+                    display_name=f"kernel-{key[0]}",
+                    system_instruction=system_instruction,
+                    tools=tools,
+                    ttl=self._cache_ttl()
+                )
+                self._caches[key] = cache
+                logger.info(f"Created context cache for {key[0]} on {model_name}: {cache.name}")
+                return genai.GenerativeModel.from_cached_content(cached_content=cache)
+            except Exception as e:
+                # Gemini rejects caches below a minimum token count, short prompts end up here
+                logger.warning(f"Context caching unavailable for {key[0]} on {model_name}, sending the prompt with each request: {e}")
 
-        model_name = config.get_setting("gemini_model") or 'gemini-3-flash-preview'
-        model = genai.GenerativeModel(
+        return genai.GenerativeModel(
             model_name=model_name,
             tools=tools,
             system_instruction=system_instruction
         )
-        return model
 
-    def process_user_intent(self, user_message):
+    def _refresh_caches(self, caches):
+        """Extends the TTL of caches that are about to expire.
+
+        A cache that already expired or cannot be extended is dropped together
+        with its model, so the request that noticed rebuilds it.
+        """
+        ttl = self._cache_ttl()
+        for key, cache in caches.items():
+            remaining = cache.expire_time - datetime.now(timezone.utc)
+            if remaining > ttl / 2:
+                continue
+            if remaining.total_seconds() > 0:
+                try:
+                    cache.update(ttl=ttl)
+                    continue
+                except Exception as e:
+                    logger.warning(f"Failed to refresh the context cache for {key[0]} on {key[1]}, rebuilding: {e}")
+            else:
+                logger.info(f"Context cache for {key[0]} on {key[1]} expired, rebuilding.")
+            with self._lock:
+                # Unless another request already rebuilt it
+                if self._caches.get(key) is cache:
+                    del self._caches[key]
+                    self._models.pop(key, None)
+
+    def _delete_caches(self, caches):
+        for key, cache in caches.items():
+            try:
+                cache.delete()
+            except Exception as e:
+                logger.warning(f"Failed to delete the context cache for {key[0]} on {key[1]}: {e}")
+
+    def _record_usage(self, workload, model, response, started):
+        """Logs how many input tokens were served from the cache, and records the call in the event log."""
+        latency_ms = round((time.monotonic() - started) * 1000, 1)
+        usage = getattr(response, 'usage_metadata', None)
+        if not usage:
+            event_log.record('llm', workload=workload, model=model.model_name, latency_ms=latency_ms)
+            return
+        prompt = usage.prompt_token_count
+        cached = getattr(usage, 'cached_content_token_count', 0)
+        logger.info(
+            f"Gemini usage ({workload}, {model.model_name}): {prompt} input tokens "
+            f"({cached} cached, {prompt - cached} uncached), {usage.candidates_token_count} output tokens."
+        )
+        event_log.record(
+            'llm', workload=workload, model=model.model_name, latency_ms=latency_ms,
+            input_tokens=prompt, cached_tokens=cached, output_tokens=usage.candidates_token_count
+        )
+
+    def _call_tool(self, function_call, speculation=None):
+        """Runs a tool the model asked for and wraps the result for the model."""
+        args = type(function_call).to_dict(function_call).get('args') or {}
+        func = self._tool_functions.get(function_call.name)
+        try:
+            if not func:
+                result = f"Unknown tool: {function_call.name}"
+            elif speculation:
+                result = speculation.call(func, args)
+            else:
+                result = func(**args)
+        except Exception as e:
+            logger.error(f"Tool {function_call.name} failed: {e}", exc_info=True)
+            result = f"Error: {e}"
+        return genai.protos.Part(function_response=genai.protos.FunctionResponse(
+            name=function_call.name, response={'result': result}
+        ))
+
+    def _send(self, chat, content, workload, request_options, speculation=None):
+        """Sends a chat message and runs the requested tools until the model answers in text.
+
+        Automatic function calling cannot be used with cached contents, so the loop is done here.
+        """
+        started = time.monotonic()
+        response = chat.send_message(content, request_options=request_options)
+        self._record_usage(workload, chat.model, response, started)
+        for _ in range(MAX_TOOL_ROUNDS):
+            calls = [part.function_call for part in response.parts if "function_call" in part]
+            if not calls:
+                break
+            results = [self._call_tool(call, speculation) for call in calls]
+            started = time.monotonic()
+            try:
+                response = chat.send_message(results, request_options=request_options)
+            except FALLBACK_ERRORS as e:
+                # The tools already ran, replaying the turn on another model would run them twice
+                e.no_fallback = True
+                raise
+            self._record_usage(workload, chat.model, response, started)
+        return response.text
+
+    def _converse(self, chat_id, content, workload, speculation=None):
+        """Runs one conversational turn for a chat and keeps its history."""
+        def call(model, request_options):
+            chat = model.start_chat(history=self.histories.get(chat_id, []))
+            text = self._send(chat, content, workload, request_options, speculation)
+            self.histories[chat_id] = chat.history
+            return text
+        return self._run(workload, 'assistant', call)
+
+    def generate(self, prompt, workload, role='assistant', **kwargs):
+        """Stateless generation (reports, lessons) on the workload's model.
+
+        Pass role='writer' for a model without tools, e.g. to request JSON output.
+        """
+        def call(model, request_options):
+            started = time.monotonic()
+            response = model.generate_content(prompt, request_options=request_options, **kwargs)
+            self._record_usage(workload, model, response, started)
+            return response.text
+        return self._run(workload, role, call)
+
+    def process_user_intent(self, user_message, chat_id=None):
         """Sends user message to Gemini and returns the response."""
-        if not self.chat:
+        if not self.api_key:
             return "I am not connected to my brain (Gemini API Key missing)."
 
+        # Likely Google reads start now and run while Gemini decides which tools to call
+        speculation = prefetcher.start(user_message, self._tool_functions)
         try:
-            # We send the message. Automatic function calling handles the tool execution loop.
-            response = self.chat.send_message(user_message)
-            return response.text
+            return self._converse(chat_id, user_message, 'chat', speculation)
         except Exception as e:
             logger.error(f"Error processing intent: {e}", exc_info=True)
             return f"I had trouble thinking about that. Error: {e}. Please try again."
+        finally:
+            speculation.finish()
 
-    def process_user_voice(self, audio_path):
+    def process_user_voice(self, audio_path, chat_id=None):
         """Processes a voice note from the user."""
-        if not self.chat:
+        if not self.api_key:
             return "I am not connected to my brain (Gemini API Key missing)."
 
         try:
@@ -133,36 +423,36 @@ class Brain:
 
             # Send the audio to the chat
             prompt = "Please listen to this audio and follow the instructions within it. Use the available tools if needed."
-            response = self.chat.send_message([prompt, audio_file])
-
-            return response.text
+            return self._converse(chat_id, [prompt, audio_file], 'voice')
         except Exception as e:
             logger.error(f"Error processing voice: {e}", exc_info=True)
             return f"I had trouble listening to that. Error: {e}. Please try again."
 
     def analyze_email_importance(self, subject, sender, snippet):
-        """Analyzes if an email is important."""
-        if not self.model: return False, "Brain missing."
+        """Analyzes if an email is important. Returns (important, reason), important is None on failure."""
+        if not self.api_key: return None, "Brain missing."
 
-        criteria = config.get_setting("importance_criteria")
+        # The criteria live in the triage model's (cached) system instruction
         prompt = f"""
-        Analyze the following email and decide if it is IMPORTANT based on this criteria: "{criteria}".
-
         Email Subject: {subject}
         Sender: {sender}
         Snippet: {snippet}
-
-        Respond with valid JSON only: {{ "important": boolean, "reason": "short explanation" }}
         """
 
+        def call(model, request_options):
+            started = time.monotonic()
+            response = model.generate_content(
+                prompt, generation_config={"response_mime_type": "application/json"}, request_options=request_options
+            )
+            self._record_usage('triage', model, response, started)
+            return response.text
+
         try:
-            # Use a separate non-chat generation for this stateless task
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-            data = json.loads(response.text)
+            data = json.loads(self._run('triage', 'triage', call))
             return data.get("important", False), data.get("reason", "No reason provided.")
         except Exception as e:
             logger.error(f"Error analyzing email: {e}")
-            return False, "Error in analysis."
+            return None, "Error in analysis."
 
 # Singleton
 brain = Brain()
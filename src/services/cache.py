@@ -0,0 +1,109 @@
+import copy
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class _InFlight:
+    """A load that is currently running. Other callers wait on it instead of loading again."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        # Set when a write invalidates the namespace while the load is running
+        self.stale = False
+
+class ReadThroughCache:
+    """Thread-safe TTL cache with single-flight loading.
+
+    Entries are grouped by namespace (usually the name of the method being
+    cached) so writes can invalidate or patch exactly the reads they affect.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}   # (namespace, key) -> (expires_at, value)
+        self._in_flight = {}  # (namespace, key) -> _InFlight
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_load(self, namespace, key, ttl, loader):
+        """Returns the cached value, or calls `loader()` once for all concurrent callers."""
+        full_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+
+            flight = self._in_flight.get(full_key)
+            if flight:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                flight = _InFlight()
+                self._in_flight[full_key] = flight
+                leader = True
+
+        if not leader:
+            flight.event.wait()
+            if flight.error:
+                raise flight.error
+            return copy.deepcopy(flight.value)
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[full_key]
+                # Errors are not cached, and a write that happened during the load
+                # (see invalidate) discards the result as it may already be stale
+                if flight.error is None and ttl > 0 and not flight.stale:
+                    now = time.monotonic()
+                    self._purge_expired(now)
+                    self._entries[full_key] = (now + ttl, flight.value)
+            flight.event.set()
+        return copy.deepcopy(flight.value)
+
+    def _purge_expired(self, now):
+        # Keys that are never read again would otherwise stay forever
+        for full_key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[full_key]
+
+    def invalidate(self, namespace):
+        """Drops every entry of a namespace."""
+        with self._lock:
+            for full_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[full_key]
+            for full_key, flight in self._in_flight.items():
+                if full_key[0] == namespace:
+                    flight.stale = True
+
+    def update(self, namespace, func):
+        """Replaces every cached value of a namespace with `func(value)`, keeping its expiry."""
+        with self._lock:
+            for full_key, (expires_at, value) in list(self._entries.items()):
+                if full_key[0] == namespace:
+                    self._entries[full_key] = (expires_at, func(value))
+            for full_key, flight in self._in_flight.items():
+                if full_key[0] == namespace:
+                    flight.stale = True
+
+    def stats(self):
+        """Returns hit/miss counters and the hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'entries': len(self._entries),
+                'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0
+            }
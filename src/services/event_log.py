@@ -0,0 +1,56 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from src.config import config
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOG_FILE = 'kernel_events.jsonl'
+
+def worker_event_log_file(worker_name):
+    """The event log of a worker process. Each process writes (and rotates) its own file."""
+    return f"kernel_events-{worker_name}.jsonl"
+
+def event_log_files():
+    """Paths of all event logs, the bot's and the workers', rotated files first."""
+    current = sorted(glob.glob('kernel_events*.jsonl'))
+    return sorted(glob.glob('kernel_events*.jsonl.1')) + current
+
+class EventLog:
+    """Append-only JSON Lines log of operational events, read by the Dashboard.
+
+    Each line is one event: {"ts": <unix time>, "kind": ..., ...fields}.
+    When the file grows past "event_log_max_mb" it is moved to `<file>.1`
+    (replacing the previous one) and a new file is started. Rotating is only
+    safe with a single writer, so every process has its own file.
+    """
+
+    def __init__(self, path=EVENT_LOG_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, kind, **fields):
+        """Appends an event. Never raises, a broken log must not break the bot."""
+        line = json.dumps({'ts': round(time.time(), 3), 'kind': kind, 'pid': os.getpid(), **fields}, default=str)
+        try:
+            with self._lock:
+                self._rotate_if_needed()
+                with open(self.path, 'a') as f:
+                    f.write(line + '\n')
+        except OSError as e:
+            logger.warning(f"Failed to write event log: {e}")
+
+    def _rotate_if_needed(self):
+        max_bytes = config.get_setting("event_log_max_mb", 50) * 1024 * 1024
+        try:
+            if os.path.getsize(self.path) < max_bytes:
+                return
+        except OSError:
+            return
+        os.replace(self.path, self.path + '.1')
+
+event_log = EventLog()
@@ -6,9 +6,16 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest, build_http
+from google_auth_httplib2 import AuthorizedHttp
 from datetime import datetime, timedelta, timezone
+import heapq
+import threading
+import time
 
 from src.config import config
+from src.services.cache import ReadThroughCache
+from src.services.event_log import event_log
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,12 +28,92 @@ SCOPES = [
     'https://www.googleapis.com/auth/tasks'
 ]
 
+# Seconds a read stays cached. Overridable per method with the
+# "google_cache_ttl_seconds" setting.
+DEFAULT_CACHE_TTLS = {
+    'list_unread_emails': 30,
+    'list_upcoming_events': 60,
+    'list_tasks': 60,
+    # Calendars and task lists rarely change
+    'list_calendars': 3600,
+    'list_task_lists': 3600
+}
+
+# Requests per batch HTTP call. Calendar rejects batches much larger than this.
+BATCH_SIZE = 50
+
+# Response fields each output key of a resource is built from, used to
+# build `fields=` masks so Google only sends what a caller will keep.
+# 'link' of an email, the calendar of an event and the list of a task are
+# derived from the request and need no extra field.
+EMAIL_FIELDS = {'subject': 'payload/headers', 'sender': 'payload/headers', 'snippet': 'snippet', 'labels': 'labelIds', 'link': None}
+EMAIL_HEADERS = {'subject': 'Subject', 'sender': 'From'}
+EVENT_FIELDS = {'summary': 'summary', 'start': 'start', 'link': 'htmlLink', 'calendar': None}
+TASK_FIELDS = {'title': 'title', 'notes': 'notes', 'due': 'due', 'link': 'selfLink', 'list': None}
+
+# Output keys each consumer reads, per resource. The id is always included.
+# The reporter pastes what it gets into a prompt, so it asks for the least.
+PROJECTIONS = {
+    'poller': {
+        'email': ('subject', 'sender', 'snippet', 'labels', 'link'),
+    },
+    'reporter': {
+        'email': ('subject', 'sender', 'snippet'),
+        'event': ('summary', 'start'),
+        'task': ('title', 'notes', 'due'),
+    },
+    'tools': {
+        'email': ('subject', 'sender', 'snippet', 'labels', 'link'),
+        'event': ('summary', 'start', 'link', 'calendar'),
+        'task': ('title', 'notes', 'due', 'link', 'list'),
+    },
+}
+
+def _start_time(start):
+    """Sort key for an event start: an aware datetime, all-day dates at local midnight."""
+    if 'T' not in start:
+        return datetime.fromisoformat(start).astimezone()
+    dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
+    return dt if dt.tzinfo else dt.astimezone()
+
+def _mask(field_map, keys):
+    """Returns the comma separated response fields needed for `keys`, plus the id."""
+    fields = {'id'} | {field_map[k] for k in keys if field_map[k]}
+    return ','.join(sorted(fields))
+
+class GoogleUnavailableError(Exception):
+    """Raised by the reads that raise when a Google service is not signed in."""
+
+class TimedHttpRequest(HttpRequest):
+    """HttpRequest that records the latency of every Google API call in the event log."""
+
+    def execute(self, *args, **kwargs):
+        start = time.monotonic()
+        status = 200
+        try:
+            return super().execute(*args, **kwargs)
+        except HttpError as error:
+            status = error.resp.status
+            raise
+        except Exception:
+            status = 0
+            raise
+        finally:
+            event_log.record(
+                'api', method=self.methodId, status=status,
+                latency_ms=round((time.monotonic() - start) * 1000, 1)
+            )
+
 class GoogleSuite:
     def __init__(self):
         self.creds = None
         self.gmail_service = None
         self.calendar_service = None
         self.tasks_service = None
+        # Shared by the poller, the reporter and the Brain tools
+        self.cache = ReadThroughCache()
+        # Per-thread HTTP connections, see `_build_request`
+        self._local = threading.local()
         self.authenticate()
 
     def authenticate(self):
@@ -63,50 +150,132 @@ class GoogleSuite:
                     return
 
         try:
-            self.gmail_service = build('gmail', 'v1', credentials=self.creds)
-            self.calendar_service = build('calendar', 'v3', credentials=self.creds)
-            self.tasks_service = build('tasks', 'v1', credentials=self.creds)
+            self.gmail_service = build('gmail', 'v1', credentials=self.creds, requestBuilder=self._build_request)
+            self.calendar_service = build('calendar', 'v3', credentials=self.creds, requestBuilder=self._build_request)
+            self.tasks_service = build('tasks', 'v1', credentials=self.creds, requestBuilder=self._build_request)
             logger.info("Google Services authenticated successfully.")
         except Exception as e:
             logger.error(f"Failed to build services: {e}")
 
-    # --- Gmail Methods ---
+    def _build_request(self, http, *args, **kwargs):
+        """Builds requests that use the calling thread's own HTTP connection.
+
+        A service shares one httplib2.Http, which is not thread-safe, and the
+        poller, chat tools, prefetcher and mail index sync call Google from
+        several threads at once.
+        """
+        http = getattr(self._local, 'http', None)
+        if http is None or http.credentials is not self.creds:
+            http = AuthorizedHttp(self.creds, http=build_http())
+            self._local.http = http
+        return TimedHttpRequest(http, *args, **kwargs)
+
+    def _cached(self, method, key, loader):
+        """Serves a read through the shared cache, using the TTL configured for `method`."""
+        ttls = config.get_setting("google_cache_ttl_seconds", {})
+        ttl = ttls.get(method, DEFAULT_CACHE_TTLS.get(method, 0))
+        return self.cache.get_or_load(method, key, ttl, loader)
+
+    def cache_stats(self):
+        """Returns hit/miss statistics of the read cache."""
+        return self.cache.stats()
+
+    def _execute_batch(self, service, requests, method):
+        """Sends requests through Google's batch endpoint, BATCH_SIZE per HTTP call.
+
+        Returns one (response, error) pair per request, in order. A failed
+        batch call fails all of its requests.
+        """
+        results = [None] * len(requests)
+
+        def callback(request_id, response, exception):
+            results[int(request_id)] = (response, exception)
+
+        for offset in range(0, len(requests), BATCH_SIZE):
+            chunk = range(offset, min(offset + BATCH_SIZE, len(requests)))
+            batch = service.new_batch_http_request(callback=callback)
+            for i in chunk:
+                batch.add(requests[i], request_id=str(i))
+
+            # Batches bypass TimedHttpRequest, so they are recorded here
+            start = time.monotonic()
+            status = 200
+            try:
+                batch.execute()
+            except HttpError as error:
+                status = error.resp.status
+                for i in chunk:
+                    results[i] = results[i] or (None, error)
+            finally:
+                event_log.record(
+                    'api', method=f"{method}.batch", status=status, size=len(chunk),
+                    latency_ms=round((time.monotonic() - start) * 1000, 1)
+                )
+        return results
 
-    def list_unread_emails(self, limit=10):
-        """Lists unread emails from the inbox."""
-        if not self.gmail_service: return []
+    # --- Gmail Methods ---
 
+    def list_unread_emails(self, limit=10, view='tools'):
+        """Lists unread emails from the inbox, with the fields of the `view` projection."""
         try:
-            results = self.gmail_service.users().messages().list(
-                userId='me', labelIds=['UNREAD'], maxResults=limit
-            ).execute()
-            messages = results.get('messages', [])
-
-            email_data = []
-            for msg in messages:
-                txt = self.gmail_service.users().messages().get(
-                    userId='me', id=msg['id']
-                ).execute()
-
-                payload = txt['payload']
-                headers = payload.get('headers', [])
-                subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '(No Subject)')
-                sender = next((h['value'] for h in headers if h['name'] == 'From'), '(Unknown)')
-                snippet = txt.get('snippet', '')
-
-                email_data.append({
-                    'id': msg['id'],
-                    'subject': subject,
-                    'sender': sender,
-                    'snippet': snippet,
-                    'labels': txt.get('labelIds', []),
-                    'link': f"https://mail.google.com/mail/u/0/#inbox/{msg['id']}"
-                })
-            return email_data
-        except HttpError as error:
+            return self.load_unread_emails(limit, view)
+        except (HttpError, GoogleUnavailableError) as error:
             logger.error(f"An error occurred in Gmail list: {error}")
             return []
 
+    def load_unread_emails(self, limit=10, view='tools'):
+        """Same as `list_unread_emails`, but raises HttpError, or GoogleUnavailableError when Gmail is not signed in."""
+        if not self.gmail_service:
+            raise GoogleUnavailableError("Gmail is not signed in.")
+        # Gemini sends tool arguments as floats
+        limit = int(limit)
+        return self._cached('list_unread_emails', (limit, view), lambda: self._fetch_unread_emails(limit, view))
+
+    def _fetch_unread_emails(self, limit, view):
+        email_data = []
+        for page, _ in self.iter_unread_pages(page_size=min(limit, 500), view=view):
+            email_data.extend(page[:limit - len(email_data)])
+            if len(email_data) >= limit:
+                break
+        return email_data
+
+    def iter_unread_pages(self, page_size=50, page_token=None, view='tools'):
+        """Yields (emails, next_page_token) for unread messages, newest first, one page at a time.
+
+        Pass the token of a previous page to resume a scan where it stopped.
+        Raises HttpError, so callers can tell a failed page from an empty one.
+        """
+        keys = PROJECTIONS[view]['email']
+        while True:
+            results = self.gmail_service.users().messages().list(
+                userId='me', labelIds=['UNREAD'], maxResults=page_size, pageToken=page_token,
+                fields='messages/id,nextPageToken'
+            ).execute()
+            emails = [self._get_email(msg['id'], keys) for msg in results.get('messages', [])]
+            page_token = results.get('nextPageToken')
+            yield emails, page_token
+            if not page_token:
+                return
+
+    def _get_email(self, msg_id, keys):
+        # Only the headers that are needed, instead of the whole MIME payload
+        txt = self.gmail_service.users().messages().get(
+            userId='me', id=msg_id, format='metadata',
+            metadataHeaders=[EMAIL_HEADERS[k] for k in keys if k in EMAIL_HEADERS],
+            fields=_mask(EMAIL_FIELDS, keys)
+        ).execute()
+
+        headers = txt.get('payload', {}).get('headers', [])
+        email = {
+            'id': msg_id,
+            'subject': next((h['value'] for h in headers if h['name'] == 'Subject'), '(No Subject)'),
+            'sender': next((h['value'] for h in headers if h['name'] == 'From'), '(Unknown)'),
+            'snippet': txt.get('snippet', ''),
+            'labels': txt.get('labelIds', []),
+            'link': f"https://mail.google.com/mail/u/0/#inbox/{msg_id}"
+        }
+        return {key: email[key] for key in ('id', *keys)}
+
     def send_email(self, to_email, subject, body):
         """Sends an email."""
         if not self.gmail_service: return False
@@ -122,9 +291,11 @@ class GoogleSuite:
             create_message = {'raw': encoded_message}
 
             self.gmail_service.users().messages().send(
-                userId='me', body=create_message
+                userId='me', body=create_message, fields='id'
             ).execute()
             logger.info(f"Email sent to {to_email}")
+            # Mail sent to ourselves shows up as unread
+            self.cache.invalidate('list_unread_emails')
             return True
         except HttpError as error:
             logger.error(f"An error occurred sending email: {error}")
@@ -136,120 +307,410 @@ class GoogleSuite:
         try:
             self.gmail_service.users().messages().modify(
                 userId='me', id=msg_id,
-                body={'removeLabelIds': ['UNREAD']}
+                body={'removeLabelIds': ['UNREAD']}, fields='id'
             ).execute()
+            # Only this message changed, so drop it from the cached lists instead of refetching them
+            self.cache.update('list_unread_emails', lambda emails: [e for e in emails if e['id'] != msg_id])
             return True
         except HttpError as error:
             logger.error(f"Failed to mark email as read: {error}")
             return False
 
+    # --- Mailbox sync (used by the local mail index, raise HttpError) ---
+
+    def get_mailbox_history_id(self):
+        """Returns the mailbox's current history id, the starting point for incremental sync."""
+        profile = self.gmail_service.users().getProfile(userId='me', fields='historyId').execute()
+        return profile['historyId']
+
+    def iter_message_ids(self, query):
+        """Yields ids of all messages matching a Gmail search query, newest first."""
+        page_token = None
+        while True:
+            results = self.gmail_service.users().messages().list(
+                userId='me', q=query, maxResults=500, pageToken=page_token,
+                fields='messages/id,nextPageToken'
+            ).execute()
+            for msg in results.get('messages', []):
+                yield msg['id']
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return
+
+    def _metadata_request(self, msg_id):
+        return self.gmail_service.users().messages().get(
+            userId='me', id=msg_id, format='metadata',
+            metadataHeaders=['Subject', 'From', 'To'],
+            fields='threadId,internalDate,snippet,labelIds,payload/headers'
+        )
+
+    def _metadata(self, msg_id, txt):
+        headers = txt.get('payload', {}).get('headers', [])
+        return {
+            'id': msg_id,
+            'thread_id': txt.get('threadId'),
+            'date': int(txt.get('internalDate', 0)) // 1000,
+            'subject': next((h['value'] for h in headers if h['name'] == 'Subject'), '(No Subject)'),
+            'sender': next((h['value'] for h in headers if h['name'] == 'From'), '(Unknown)'),
+            'to': next((h['value'] for h in headers if h['name'] == 'To'), ''),
+            'snippet': txt.get('snippet', ''),
+            'labels': txt.get('labelIds', [])
+        }
+
+    def get_email_metadata(self, msg_id):
+        """Returns the headers, snippet and labels of a message, or None if it no longer exists."""
+        try:
+            txt = self._metadata_request(msg_id).execute()
+        except HttpError as error:
+            if error.resp.status == 404:
+                return None
+            raise
+        return self._metadata(msg_id, txt)
+
+    def get_emails_metadata(self, msg_ids):
+        """Like `get_email_metadata` for many messages, in batch HTTP calls. Returns {id: metadata or None}."""
+        msg_ids = list(msg_ids)
+        results = self._execute_batch(self.gmail_service, [self._metadata_request(i) for i in msg_ids], 'gmail.users.messages.get')
+        metadata = {}
+        for msg_id, (response, error) in zip(msg_ids, results):
+            if error is None:
+                metadata[msg_id] = self._metadata(msg_id, response)
+            elif isinstance(error, HttpError) and error.resp.status == 404:
+                metadata[msg_id] = None
+            else:
+                # Gmail rejects part of a batch when it is busy (429), those are read one by one
+                metadata[msg_id] = self.get_email_metadata(msg_id)
+        return metadata
+
+    def list_mailbox_changes(self, start_history_id):
+        """Returns (changed_ids, deleted_ids, new_history_id) since a history id.
+
+        Raises HttpError 404 when the history id is too old, in which case a full sync is needed.
+        """
+        changed, deleted = set(), set()
+        history_id = start_history_id
+        page_token = None
+        while True:
+            results = self.gmail_service.users().history().list(
+                userId='me', startHistoryId=start_history_id, pageToken=page_token,
+                historyTypes=['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved'],
+                fields='history(messagesAdded/message/id,messagesDeleted/message/id,'
+                       'labelsAdded/message/id,labelsRemoved/message/id),historyId,nextPageToken'
+            ).execute()
+            for record in results.get('history', []):
+                for item in record.get('messagesAdded', []) + record.get('labelsAdded', []) + record.get('labelsRemoved', []):
+                    changed.add(item['message']['id'])
+                for item in record.get('messagesDeleted', []):
+                    deleted.add(item['message']['id'])
+            history_id = results.get('historyId', history_id)
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+        return changed - deleted, deleted, history_id
+
     # --- Calendar Methods ---
 
-    def list_upcoming_events(self, hours=24):
-        """Lists events in the next X hours."""
+    def list_calendars(self):
+        """Lists the calendars the user has selected in Google Calendar, as {'id', 'summary'}."""
         if not self.calendar_service: return []
 
         try:
-            now = datetime.now(timezone.utc).isoformat()
-            # Z is UTC suffix
-            end_time = (datetime.now(timezone.utc) + timedelta(hours=hours)).isoformat()
+            return self._cached('list_calendars', (), self._fetch_calendars)
+        except HttpError as error:
+            logger.error(f"An error occurred in Calendar list: {error}")
+            return []
 
-            events_result = self.calendar_service.events().list(
-                calendarId='primary', timeMin=now, timeMax=end_time,
-                singleEvents=True, orderBy='startTime'
+    def _fetch_calendars(self):
+        calendars = []
+        page_token = None
+        while True:
+            results = self.calendar_service.calendarList().list(
+                pageToken=page_token, fields='items(id,summary,summaryOverride,primary,selected),nextPageToken'
             ).execute()
-            events = events_result.get('items', [])
+            for item in results.get('items', []):
+                # Calendars unticked in the Calendar UI are subscribed to but not wanted, e.g. holidays
+                if item.get('primary') or item.get('selected'):
+                    calendars.append({
+                        'id': 'primary' if item.get('primary') else item['id'],
+                        'summary': item.get('summaryOverride') or item.get('summary', item['id'])
+                    })
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return calendars
+
+    def list_upcoming_events(self, hours=24, view='tools'):
+        """Lists events of all calendars in the next X hours, in start order, with the fields of the `view` projection."""
+        try:
+            return self.load_upcoming_events(hours, view)
+        except (HttpError, GoogleUnavailableError) as error:
+            logger.error(f"An error occurred in Calendar list: {error}")
+            return []
 
+    def load_upcoming_events(self, hours=24, view='tools'):
+        """Same as `list_upcoming_events`, for callers that must tell a failure from an empty calendar.
+
+        Raises HttpError, or GoogleUnavailableError when Calendar is not signed in.
+        """
+        if not self.calendar_service:
+            raise GoogleUnavailableError("Google Calendar is not signed in.")
+        return self._cached('list_upcoming_events', (hours, view), lambda: self._fetch_upcoming_events(hours, view))
+
+    def _fetch_upcoming_events(self, hours, view):
+        keys = PROJECTIONS[view]['event']
+        now = datetime.now(timezone.utc).isoformat()
+        # Z is UTC suffix
+        end_time = (datetime.now(timezone.utc) + timedelta(hours=hours)).isoformat()
+
+        calendars = self.list_calendars() or [{'id': 'primary', 'summary': 'primary'}]
+        # One batch call for all calendars, so this costs about as much as reading one
+        requests = [
+            self.calendar_service.events().list(
+                calendarId=calendar['id'], timeMin=now, timeMax=end_time,
+                singleEvents=True, orderBy='startTime',
+                fields=f"items({_mask(EVENT_FIELDS, keys)})"
+            )
+            for calendar in calendars
+        ]
+        results = self._execute_batch(self.calendar_service, requests, 'calendar.events.list')
+        if not any(error is None for _, error in results):
+            raise results[0][1]
+
+        per_calendar = []
+        for calendar, (response, error) in zip(calendars, results):
+            if error:
+                logger.error(f"An error occurred listing calendar {calendar['summary']}: {error}")
+                continue
             clean_events = []
-            for event in events:
-                start = event['start'].get('dateTime', event['start'].get('date'))
-                clean_events.append({
+            for event in response.get('items', []):
+                start = event.get('start', {})
+                clean = {
                     'id': event['id'],
                     'summary': event.get('summary', 'No Title'),
-                    'start': start,
-                    'link': event.get('htmlLink')
-                })
-            return clean_events
-        except HttpError as error:
-            logger.error(f"An error occurred in Calendar list: {error}")
-            return []
+                    'start': start.get('dateTime', start.get('date')),
+                    'link': event.get('htmlLink'),
+                    'calendar': calendar['summary']
+                }
+                clean_events.append({key: clean[key] for key in ('id', *keys)})
+            per_calendar.append(clean_events)
+
+        # Each calendar is already in start order, merge them keeping that order.
+        # An event shared into several calendars is listed once.
+        events, seen = [], set()
+        for event in heapq.merge(*per_calendar, key=lambda e: _start_time(e['start'])):
+            if event['id'] not in seen:
+                seen.add(event['id'])
+                events.append(event)
+        return events
+
+    def _event_body(self, summary, start_time_iso, end_time_iso=None, description=None):
+        # If no end time, assume 1 hour
+        if not end_time_iso:
+            start_dt = datetime.fromisoformat(start_time_iso)
+            end_dt = start_dt + timedelta(hours=1)
+            end_time_iso = end_dt.isoformat()
+
+        return {
+            'summary': summary,
+            'description': description,
+            'start': {'dateTime': start_time_iso}, # Let Google Calendar interpret timezone (uses calendar default)
+            'end': {'dateTime': end_time_iso},
+        }
 
     def create_event(self, summary, start_time_iso, end_time_iso=None, description=None):
         """Creates a calendar event. Times must be ISO format strings."""
         if not self.calendar_service: return False
 
         try:
-            # If no end time, assume 1 hour
-            if not end_time_iso:
-                start_dt = datetime.fromisoformat(start_time_iso)
-                end_dt = start_dt + timedelta(hours=1)
-                end_time_iso = end_dt.isoformat()
-
-            event = {
-                'summary': summary,
-                'description': description,
-                'start': {'dateTime': start_time_iso}, # Let Google Calendar interpret timezone (uses calendar default)
-                'end': {'dateTime': end_time_iso},
-            }
-
+            event = self._event_body(summary, start_time_iso, end_time_iso, description)
             event = self.calendar_service.events().insert(
-                calendarId='primary', body=event
+                calendarId='primary', body=event, fields='htmlLink'
             ).execute()
             logger.info(f"Event created: {event.get('htmlLink')}")
+            self.cache.invalidate('list_upcoming_events')
             return event.get('htmlLink')
         except HttpError as error:
             logger.error(f"An error occurred creating event: {error}")
             return None
 
+    def create_events(self, events):
+        """Creates several calendar events in batch HTTP calls.
+
+        `events` is a list of dicts with the arguments of `create_event`.
+        Returns one {'summary', 'ok', 'link' or 'error'} dict per event, in order.
+        """
+        if not self.calendar_service: return False
+
+        results = [{'summary': e.get('summary'), 'ok': False} for e in events]
+        requests, indexes = [], []
+        for i, e in enumerate(events):
+            try:
+                body = self._event_body(e.get('summary'), e.get('start_time_iso'), e.get('end_time_iso'), e.get('description'))
+            except (TypeError, ValueError) as error:
+                results[i]['error'] = f"Invalid time: {error}"
+                continue
+            requests.append(self.calendar_service.events().insert(calendarId='primary', body=body, fields='htmlLink'))
+            indexes.append(i)
+
+        for i, (response, error) in zip(indexes, self._execute_batch(self.calendar_service, requests, 'calendar.events.insert')):
+            if error:
+                results[i]['error'] = str(error)
+            else:
+                results[i].update(ok=True, link=response.get('htmlLink'))
+
+        created = sum(r['ok'] for r in results)
+        logger.info(f"Events created: {created}/{len(events)}")
+        if created:
+            self.cache.invalidate('list_upcoming_events')
+        return results
+
     # --- Tasks Methods ---
 
-    def list_tasks(self, limit=10):
-        """Lists tasks from the default task list."""
+    def list_task_lists(self):
+        """Lists the user's task lists, as {'id', 'title'}."""
         if not self.tasks_service: return []
 
         try:
-            results = self.tasks_service.tasks().list(
-                tasklist='@default', maxResults=limit, showCompleted=False
+            return self._cached('list_task_lists', (), self._fetch_task_lists)
+        except HttpError as error:
+            logger.error(f"An error occurred in Tasks list: {error}")
+            return []
+
+    def _fetch_task_lists(self):
+        task_lists = []
+        page_token = None
+        while True:
+            results = self.tasks_service.tasklists().list(
+                maxResults=100, pageToken=page_token, fields='items(id,title),nextPageToken'
             ).execute()
-            items = results.get('items', [])
+            task_lists.extend({'id': item['id'], 'title': item.get('title', '')} for item in results.get('items', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return task_lists
+
+    def list_tasks(self, limit=10, view='tools'):
+        """Lists open tasks of all task lists, soonest due first, with the fields of the `view` projection."""
+        try:
+            return self.load_tasks(limit, view)
+        except (HttpError, GoogleUnavailableError) as error:
+            logger.error(f"An error occurred in Tasks list: {error}")
+            return []
+
+    def load_tasks(self, limit=10, view='tools'):
+        """Same as `list_tasks`, but raises HttpError, or GoogleUnavailableError when Tasks is not signed in."""
+        if not self.tasks_service:
+            raise GoogleUnavailableError("Google Tasks is not signed in.")
+        # Gemini sends tool arguments as floats
+        limit = int(limit)
+        return self._cached('list_tasks', (limit, view), lambda: self._fetch_tasks(limit, view))
+
+    def _fetch_tasks(self, limit, view):
+        keys = PROJECTIONS[view]['task']
+        # Due dates are always needed to order tasks across lists
+        fields = _mask(TASK_FIELDS, keys + ('due',))
+
+        task_lists = self.list_task_lists() or [{'id': '@default', 'title': 'My Tasks'}]
+        # Lists come in manual order and cannot be sorted by due date server side,
+        # so every open task is read to find the soonest due ones
+        requests = [
+            self.tasks_service.tasks().list(
+                tasklist=task_list['id'], maxResults=100, showCompleted=False,
+                fields=f"items({fields}),nextPageToken"
+            )
+            for task_list in task_lists
+        ]
+        results = self._execute_batch(self.tasks_service, requests, 'tasks.tasks.list')
+        if not any(error is None for _, error in results):
+            raise results[0][1]
+
+        per_list = []
+        for task_list, (response, error) in zip(task_lists, results):
+            if error:
+                logger.error(f"An error occurred listing task list {task_list['title']}: {error}")
+                continue
+            items = response.get('items', [])
+            page_token = response.get('nextPageToken')
+            while page_token:
+                # Rare: lists with more than 100 open tasks are paged through one by one
+                page = self.tasks_service.tasks().list(
+                    tasklist=task_list['id'], maxResults=100, showCompleted=False, pageToken=page_token,
+                    fields=f"items({fields}),nextPageToken"
+                ).execute()
+                items.extend(page.get('items', []))
+                page_token = page.get('nextPageToken')
 
             tasks = []
             for item in items:
                 tasks.append({
                     'id': item['id'],
-                    'title': item['title'],
+                    'title': item.get('title', ''),
                     'notes': item.get('notes', ''),
                     'due': item.get('due'),
-                    'link': item.get('selfLink') # Tasks don't always have a web link in the 'links' field easily accessible
+                    'link': item.get('selfLink'), # Tasks don't always have a web link in the 'links' field easily accessible
+                    'list': task_list['title']
                 })
-            return tasks
-        except HttpError as error:
-            logger.error(f"An error occurred in Tasks list: {error}")
-            return []
+            # Sort each list by due date (undated last) for the merge
+            per_list.append(sorted(tasks, key=lambda t: (t['due'] is None, t['due'] or '')))
+
+        merged = heapq.merge(*per_list, key=lambda t: (t['due'] is None, t['due'] or ''))
+        return [{key: task[key] for key in ('id', *keys)} for task, _ in zip(merged, range(limit))]
+
+    def _task_body(self, title, notes=None, due_date_iso=None, urgency=None):
+        # Handle urgency
+        if urgency and str(urgency).lower() in ['true', 'high', 'urgent', 'very']:
+            title = f"[URGENT] {title}"
+
+        task = {'title': title, 'notes': notes}
+        if due_date_iso:
+            # Tasks API requires RFC 3339 timestamp
+            task['due'] = due_date_iso
+        return task
 
     def add_task(self, title, notes=None, due_date_iso=None, urgency=None):
         """Adds a task to the default list."""
         if not self.tasks_service: return False
 
         try:
-            # Handle urgency
-            if urgency and str(urgency).lower() in ['true', 'high', 'urgent', 'very']:
-                title = f"[URGENT] {title}"
-
-            task = {'title': title, 'notes': notes}
-            if due_date_iso:
-                # Tasks API requires RFC 3339 timestamp
-                task['due'] = due_date_iso
-
+            task = self._task_body(title, notes, due_date_iso, urgency)
             result = self.tasks_service.tasks().insert(
-                tasklist='@default', body=task
+                tasklist='@default', body=task, fields='title,selfLink,webViewLink'
             ).execute()
             logger.info(f"Task created: {result.get('title')}")
+            self.cache.invalidate('list_tasks')
             # Safely return a link to the task, or a default message
             return result.get('webViewLink') or result.get('selfLink') or 'Task Created'
         except HttpError as error:
             logger.error(f"An error occurred creating task: {error}")
             return None
 
+    def add_tasks(self, tasks):
+        """Adds several tasks to the default list in batch HTTP calls.
+
+        `tasks` is a list of dicts with the arguments of `add_task`.
+        Returns one {'title', 'ok', 'link' or 'error'} dict per task, in order.
+        """
+        if not self.tasks_service: return False
+
+        requests = [
+            self.tasks_service.tasks().insert(
+                tasklist='@default', fields='title,selfLink,webViewLink',
+                body=self._task_body(t.get('title'), t.get('notes'), t.get('due_date_iso'), t.get('urgency'))
+            )
+            for t in tasks
+        ]
+
+        results = []
+        for task, (response, error) in zip(tasks, self._execute_batch(self.tasks_service, requests, 'tasks.tasks.insert')):
+            if error:
+                results.append({'title': task.get('title'), 'ok': False, 'error': str(error)})
+            else:
+                link = response.get('webViewLink') or response.get('selfLink') or 'Task Created'
+                results.append({'title': task.get('title'), 'ok': True, 'link': link})
+
+        created = sum(r['ok'] for r in results)
+        logger.info(f"Tasks created: {created}/{len(tasks)}")
+        if created:
+            self.cache.invalidate('list_tasks')
+        return results
+
 # Singleton instance
 google_suite = GoogleSuite()
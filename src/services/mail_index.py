@@ -0,0 +1,262 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from googleapiclient.errors import HttpError
+import google.generativeai as genai
+
+from src.config import config
+from src.services.google_suite import google_suite
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'mail_index.json'
+VECTORS_FILE = 'mail_index_vectors.npy'
+EMBEDDING_MODEL = 'models/text-embedding-004'
+
+# Words that say nothing about which email the user means
+STOPWORDS = {
+    'the', 'and', 'or', 'to', 'of', 'in', 'on', 'for', 'at', 'is', 'it', 'me', 'my', 'about',
+    'what', 'did', 'do', 'say', 'said', 'email', 'emails', 'from', 'last', 'week', 'with'
+}
+
+def tokenize(text):
+    return [t for t in re.findall(r"\w+", text.lower()) if len(t) > 1]
+
+class MailIndex:
+    """Local index of email metadata and snippets, kept in sync with Gmail.
+
+    Messages are stored in a JSON file and searched through an in-memory
+    inverted index that is rebuilt on load. When embeddings are enabled and
+    NumPy is installed, a vector per message is kept in a .npy file next to it.
+    """
+
+    def __init__(self, path=INDEX_FILE, vectors_path=VECTORS_FILE):
+        self.path = path
+        self.vectors_path = vectors_path
+        self.messages = {}
+        self.history_id = None
+        self.postings = {}
+        self.vector_ids = []
+        self.vectors = None
+        self._loaded_mtime = None
+        self._lock = threading.RLock()
+
+    # --- Persistence ---
+
+    def _load(self):
+        """(Re)loads the index if the file changed on disk, e.g. after a sync in another process."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+
+        with self._lock:
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.error(f"Failed to load mail index: {e}")
+                return
+
+            self.history_id = data.get('history_id')
+            self.messages = data.get('messages', {})
+            self.vector_ids = data.get('vector_ids', [])
+            self.vectors = None
+            if np is not None and self.vector_ids and os.path.exists(self.vectors_path):
+                self.vectors = np.load(self.vectors_path)
+            self._rebuild_postings()
+            self._loaded_mtime = mtime
+            logger.info(f"Mail index loaded with {len(self.messages)} messages.")
+
+    def _save(self):
+        with self._lock:
+            if self.vectors is not None:
+                # np.save appends .npy to names without it, so keep the suffix on the temp file
+                tmp_vectors = self.vectors_path + '.tmp.npy'
+                np.save(tmp_vectors, self.vectors)
+                os.replace(tmp_vectors, self.vectors_path)
+
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'history_id': self.history_id,
+                    'messages': self.messages,
+                    'vector_ids': self.vector_ids
+                }, f)
+            os.replace(tmp_path, self.path)
+            self._loaded_mtime = os.path.getmtime(self.path)
+
+    def _rebuild_postings(self):
+        self.postings = {}
+        for msg in self.messages.values():
+            self._add_postings(msg)
+
+    def _add_postings(self, msg):
+        for term in set(tokenize(f"{msg['subject']} {msg['sender']} {msg['to']} {msg['snippet']}")):
+            self.postings.setdefault(term, set()).add(msg['id'])
+
+    def _remove_postings(self, msg):
+        for term in set(tokenize(f"{msg['subject']} {msg['sender']} {msg['to']} {msg['snippet']}")):
+            ids = self.postings.get(term)
+            if ids:
+                ids.discard(msg['id'])
+                if not ids:
+                    del self.postings[term]
+
+    # --- Sync ---
+
+    def sync(self):
+        """Brings the index up to date with Gmail. Runs a full sync the first time."""
+        if not config.get_setting("mail_index_enabled", True) or not google_suite.gmail_service:
+            return
+
+        self._load()
+        start = time.monotonic()
+        try:
+            if self.history_id:
+                try:
+                    changed, deleted, history_id = google_suite.list_mailbox_changes(self.history_id)
+                except HttpError as error:
+                    if error.resp.status != 404:
+                        raise
+                    logger.warning("Mail index history expired, running a full sync.")
+                    self.history_id = None
+
+            if not self.history_id:
+                # Take the history id first so changes made during the full sync are picked up next time
+                history_id = google_suite.get_mailbox_history_id()
+                days = config.get_setting("mail_index_days", 90)
+                max_messages = config.get_setting("mail_index_max_messages", 5000)
+                changed = set()
+                for msg_id in google_suite.iter_message_ids(f"newer_than:{days}d"):
+                    changed.add(msg_id)
+                    if len(changed) >= max_messages:
+                        break
+                deleted = set(self.messages) - changed
+                changed -= set(self.messages)
+
+            with self._lock:
+                for msg_id in deleted:
+                    self._remove(msg_id)
+
+            updated = []
+            for msg_id, msg in google_suite.get_emails_metadata(changed).items():
+                with self._lock:
+                    if not msg:
+                        self._remove(msg_id)
+                        continue
+                    old = self.messages.get(msg_id)
+                    if old:
+                        self._remove_postings(old)
+                    self.messages[msg_id] = msg
+                    self._add_postings(msg)
+                    updated.append(msg)
+
+            if np is not None and config.get_setting("mail_index_embeddings", False):
+                # Label changes keep their vector, only new messages are embedded
+                embedded = set(self.vector_ids)
+                missing = [m for m in self.messages.values() if m['id'] not in embedded]
+                if missing:
+                    self._embed(missing)
+
+            self.history_id = history_id
+            self._save()
+            logger.info(
+                f"Mail index synced in {time.monotonic() - start:.1f}s: "
+                f"{len(updated)} updated, {len(deleted)} removed, {len(self.messages)} total."
+            )
+        except HttpError as error:
+            logger.error(f"Mail index sync failed: {error}")
+
+    def _remove(self, msg_id):
+        msg = self.messages.pop(msg_id, None)
+        if msg:
+            self._remove_postings(msg)
+        if msg_id in self.vector_ids:
+            i = self.vector_ids.index(msg_id)
+            del self.vector_ids[i]
+            self.vectors = np.delete(self.vectors, i, axis=0)
+
+    def _embed(self, messages):
+        """Adds embedding vectors for messages (in batches of 100, the API limit)."""
+        for i in range(0, len(messages), 100):
+            batch = messages[i:i + 100]
+            try:
+                result = genai.embed_content(
+                    model=EMBEDDING_MODEL, task_type='retrieval_document',
+                    content=[f"{m['subject']}\n{m['sender']}\n{m['snippet']}" for m in batch]
+                )
+            except Exception as e:
+                logger.error(f"Failed to embed emails: {e}")
+                return
+            vectors = np.asarray(result['embedding'], dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-9
+            with self._lock:
+                self.vectors = vectors if self.vectors is None else np.vstack([self.vectors, vectors])
+                self.vector_ids.extend(m['id'] for m in batch)
+
+    # --- Search ---
+
+    def search(self, query, limit=5):
+        """Returns the best matching emails for a free-text query, newest first among equals."""
+        # Gemini sends tool arguments as floats
+        limit = int(limit)
+        self._load()
+        with self._lock:
+            if not self.messages:
+                return []
+
+            scores = {}
+            total = len(self.messages)
+            for term in set(tokenize(query)) - STOPWORDS:
+                ids = self.postings.get(term)
+                if not ids:
+                    continue
+                idf = math.log(1 + total / len(ids))
+                for msg_id in ids:
+                    scores[msg_id] = scores.get(msg_id, 0.0) + idf
+
+            if self.vectors is not None and config.get_setting("mail_index_embeddings", False):
+                self._add_semantic_scores(query, scores)
+
+            ranked = sorted(scores, key=lambda i: (scores[i], self.messages[i]['date']), reverse=True)
+            return [self._format(self.messages[i]) for i in ranked[:limit]]
+
+    def _add_semantic_scores(self, query, scores):
+        try:
+            result = genai.embed_content(model=EMBEDDING_MODEL, content=query, task_type='retrieval_query')
+        except Exception as e:
+            logger.error(f"Failed to embed query, using keyword search only: {e}")
+            return
+        query_vector = np.asarray(result['embedding'], dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) + 1e-9
+        similarities = self.vectors @ query_vector
+        # Only the closest matches count, so unrelated mail does not get a small boost
+        for i in np.argsort(similarities)[::-1][:50]:
+            msg_id = self.vector_ids[i]
+            scores[msg_id] = scores.get(msg_id, 0.0) + 5 * float(similarities[i])
+
+    def _format(self, msg):
+        return {
+            'id': msg['id'],
+            'date': datetime.fromtimestamp(msg['date']).isoformat(timespec='minutes'),
+            'sender': msg['sender'],
+            'subject': msg['subject'],
+            'snippet': msg['snippet'],
+            'unread': 'UNREAD' in msg['labels'],
+            'link': f"https://mail.google.com/mail/u/0/#all/{msg['id']}"
+        }
+
+mail_index = MailIndex()
@@ -1,91 +1,143 @@
 import logging
+import time
+from googleapiclient.errors import HttpError
 from src.config import config
 from src.services.google_suite import google_suite
 from src.services.brain import brain
-from datetime import datetime, timezone
+from src.services.event_log import event_log
+from src.services.triage_model import triage_model
 
 logger = logging.getLogger(__name__)
 
 class Poller:
     def __init__(self):
         self.notified_email_ids = set()
-        self.notified_event_ids = set()
         # Clean caches occasionally? For now, we assume memory is plenty for IDs.
+        # Page tokens where the scan of older unread mail stopped, oldest scan first
+        self.backlog_tokens = []
 
     def poll_emails(self):
-        """Checks for new important emails. Returns a list of alert strings."""
+        """Checks for new important emails. Returns a list of (alert text, email id).
+
+        New mail is read from the newest page down until it reaches mail that
+        was already seen. Any older unread backlog is worked through a page at
+        a time, continuing from where the previous cycle stopped, until the
+        cycle's time budget is spent.
+        """
+        started = time.monotonic()
+        seen_before = len(self.notified_email_ids)
         alerts = []
         try:
-            # check unread emails
-            emails = google_suite.list_unread_emails(limit=10)
-            if not emails:
-                return []
-
-            use_ai = config.get_setting("ai_email_filtering", True)
+            self._poll_pages(alerts, started)
+        finally:
+            event_log.record(
+                'poll', duration_ms=round((time.monotonic() - started) * 1000, 1),
+                emails=len(self.notified_email_ids) - seen_before, alerts=len(alerts),
+                backlog_cursors=len(self.backlog_tokens)
+            )
+        return alerts
+
+    def _poll_pages(self, alerts, started):
+        """Fills `alerts` from new mail and the backlog, within the cycle's time budget."""
+        deadline = started + config.get_setting("poll_time_budget_seconds", 60)
+        page_size = config.get_setting("poll_page_size", 25)
+        try:
+            # 1. New mail, newest first
+            page_token = None
+            for emails, next_token in google_suite.iter_unread_pages(page_size, view='poller'):
+                fresh = [e for e in emails if e['id'] not in self.notified_email_ids]
+                page_alerts, finished = self._triage(fresh, deadline)
+                alerts.extend(page_alerts)
+                if not finished:
+                    # Out of time mid-page. The rest of the first page is rescanned as new mail
+                    # next cycle, a later page is resumed as backlog (its seen emails are skipped).
+                    resume_token = page_token or next_token
+                    if resume_token:
+                        self.backlog_tokens.append(resume_token)
+                    return
+                if len(fresh) < len(emails) or not next_token:
+                    break
+                if time.monotonic() > deadline:
+                    # Out of time before reaching known mail, pick this up again as backlog
+                    self.backlog_tokens.append(next_token)
+                    return
+                page_token = next_token
+
+            # 2. Older backlog, resumed from the saved page tokens
+            while self.backlog_tokens and time.monotonic() < deadline:
+                token = self.backlog_tokens[0]
+                emails, next_token = next(google_suite.iter_unread_pages(page_size, page_token=token, view='poller'))
+                fresh = [e for e in emails if e['id'] not in self.notified_email_ids]
+                page_alerts, finished = self._triage(fresh, deadline)
+                alerts.extend(page_alerts)
+                if not finished:
+                    # Out of time mid-page, this page is read again next cycle
+                    break
+                if next_token and fresh:
+                    self.backlog_tokens[0] = next_token
+                else:
+                    # Reached the end, or a page we have fully seen already
+                    self.backlog_tokens.pop(0)
 
-            for email in emails:
-                if email['id'] in self.notified_email_ids:
-                    continue
+            if self.backlog_tokens:
+                logger.info(f"Unread backlog not finished, resuming next cycle ({len(self.backlog_tokens)} cursors).")
+        except HttpError as e:
+            # Page tokens can expire; start over from the newest mail next time
+            logger.error(f"Error polling emails: {e}")
+            self.backlog_tokens = []
+        except Exception as e:
+            logger.error(f"Error polling emails: {e}")
 
-                is_important = False
-                reason = ""
+    def _triage(self, emails, deadline=None):
+        """Decides which emails are important. Returns (alerts, whether all emails were triaged).
 
-                if use_ai:
+        Stops before the next email once `deadline` (a time.monotonic() value) has passed.
+        """
+        alerts = []
+        use_ai = config.get_setting("ai_email_filtering", True)
+
+        for email in emails:
+            if deadline is not None and time.monotonic() > deadline:
+                return alerts, False
+            is_important = False
+            reason = ""
+
+            if use_ai:
+                # Confident cases are decided by the local model, the rest by Gemini
+                started = time.monotonic()
+                local = triage_model.predict(email)
+                if local:
+                    is_important, probability = local
+                    reason = f"Learned from your feedback ({max(probability, 1 - probability):.0%} sure)."
+                    triage_model.observe(email)
+                    source = 'local'
+                else:
                     is_important, reason = brain.analyze_email_importance(
                         email['subject'], email['sender'], email['snippet']
                     )
+                    # Gemini's decisions become training examples
+                    triage_model.observe(email, is_important)
+                    source = 'llm'
+                event_log.record(
+                    'triage', source=source, important=bool(is_important),
+                    latency_ms=round((time.monotonic() - started) * 1000, 3)
+                )
+            else:
+                # Simple filtering: Check if 'IMPORTANT' label exists
+                if 'IMPORTANT' in email.get('labels', []):
+                    is_important = True
+                    reason = "Marked as Important in Gmail."
                 else:
-                    # Simple filtering: Check if 'IMPORTANT' label exists
-                    if 'IMPORTANT' in email.get('labels', []):
-                        is_important = True
-                        reason = "Marked as Important in Gmail."
-                    else:
-                        is_important = False
+                    is_important = False
 
-                if is_important:
-                    alerts.append(
-                        f"📧 **Important Email**\nFrom: {email['sender']}\nSubject: {email['subject']}\nReason: {reason}\n[Open]({email['link']})"
-                    )
-                    self.notified_email_ids.add(email['id'])
-                else:
-                    # If analyzed and not important, still mark as 'seen' by the poller so we don't re-analyze
-                    self.notified_email_ids.add(email['id'])
+            if is_important:
+                alerts.append((
+                    f"📧 **Important Email**\nFrom: {email['sender']}\nSubject: {email['subject']}\nReason: {reason}\n[Open]({email['link']})",
+                    email['id']
+                ))
+            # If analyzed and not important, still mark as 'seen' by the poller so we don't re-analyze
+            self.notified_email_ids.add(email['id'])
 
-            return alerts
-        except Exception as e:
-            logger.error(f"Error polling emails: {e}")
-            return []
-
-    def poll_calendar(self):
-        """Checks for upcoming events. Returns a list of alert strings."""
-        alerts = []
-        try:
-            # Check events in next 30 minutes
-            events = google_suite.list_upcoming_events(hours=0.5)
-
-            for event in events:
-                if event['id'] in self.notified_event_ids:
-                    continue
-
-                # We could add logic to only notify if start time is within X minutes
-                # But list_upcoming_events(0.5) implies they are starting soon.
-
-                start_str = event['start'] # ISO string
-                # Simple parsing for display
-                try:
-                    dt = datetime.fromisoformat(start_str)
-                    time_display = dt.strftime("%H:%M")
-                except:
-                    time_display = start_str
-
-                alerts.append(
-                    f"📅 **Upcoming Event**\n{event['summary']}\nAt: {time_display}\n[Link]({event['link']})"
-                )
-                self.notified_event_ids.add(event['id'])
-
-            return alerts
-        except Exception as e:
-            logger.error(f"Error polling calendar: {e}")
-            return []
+        return alerts, True
 
 poller = Poller()
@@ -0,0 +1,132 @@
+import inspect
+import json
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config import config
+from src.services.event_log import event_log
+
+logger = logging.getLogger(__name__)
+
+# Read-only Brain tools worth starting before Gemini asks for them, with the
+# words that suggest it will. Arguments are the tools' defaults.
+PREFETCH_RULES = {
+    'list_upcoming_events': r"\b(calendar|schedule|agenda|meetings?|events?|appointments?|day|today|tonight|tomorrow|week|busy|free)\b",
+    'list_todo_tasks': r"\b(tasks?|todos?|to ?dos?|to-dos?|chores|errands)\b",
+    'list_unread_emails': r"\b(e-?mails?|mail|inbox|unread|messages)\b",
+}
+
+# Write tools and the prefetchable reads whose results they make stale
+WRITES_INVALIDATE = {
+    'create_calendar_event': {'list_upcoming_events'},
+    'create_calendar_events': {'list_upcoming_events'},
+    'add_todo_task': {'list_todo_tasks'},
+    'add_todo_tasks': {'list_todo_tasks'},
+    # Mail sent to ourselves shows up as unread
+    'send_email': {'list_unread_emails'},
+}
+
+def _call_key(func, args):
+    """Identifies a tool call by its name and full arguments, defaults included."""
+    bound = inspect.signature(func).bind(**args)
+    bound.apply_defaults()
+    # Gemini sends numbers as floats
+    values = {k: int(v) if isinstance(v, float) and v.is_integer() else v for k, v in bound.arguments.items()}
+    return func.__name__, json.dumps(values, sort_keys=True, default=str)
+
+class Speculation:
+    """The reads started for one user message."""
+
+    def __init__(self, prefetcher, futures):
+        self.prefetcher = prefetcher
+        self.futures = futures  # call key -> Future
+        self.used = set()
+        self.stale = set()
+
+    def call(self, func, args):
+        """Runs a tool call, served from a prefetched result when one was started for it."""
+        if func.__name__ in WRITES_INVALIDATE:
+            # Reads prefetched before this write would miss it, they are wasted from now on
+            stale_reads = WRITES_INVALIDATE[func.__name__]
+            self.stale.update(key for key in self.futures if key[0] in stale_reads)
+            return func(**args)
+        if func.__name__ not in PREFETCH_RULES:
+            return func(**args)
+
+        key = _call_key(func, args)
+        if key in self.stale:
+            return func(**args)
+        future = self.futures.get(key)
+        if future is None:
+            self.prefetcher._count(misses=1)
+            return func(**args)
+
+        self.used.add(key)
+        try:
+            return future.result()
+        except Exception as e:
+            logger.warning(f"Prefetched {func.__name__} failed, calling it again: {e}")
+            return func(**args)
+
+    def finish(self):
+        """Records which prefetched reads were used. Call once the turn is over."""
+        hits = len(self.used)
+        wasted = len(self.futures) - hits
+        self.prefetcher._count(hits=hits, wasted=wasted)
+        if self.futures:
+            event_log.record('prefetch', started=len(self.futures), hits=hits, wasted=wasted)
+
+class Prefetcher:
+    """Starts the Google reads a message will probably need while Gemini is still thinking.
+
+    The message is matched against PREFETCH_RULES. Every matching tool is
+    started on a small thread pool, and when the model then asks for that exact
+    call it gets the result without waiting for a fetch.
+
+    Counts hits (prefetches the model used), wasted prefetches, and misses
+    (prefetchable calls that were not predicted), see `stats`.
+    """
+
+    def __init__(self):
+        self.rules = {name: re.compile(pattern, re.IGNORECASE) for name, pattern in PREFETCH_RULES.items()}
+        # Prefetches run next to the tool calls the model makes. GoogleSuite gives every
+        # thread its own HTTP connection, so these never share one with a tool call.
+        self._executor = ThreadPoolExecutor(max_workers=len(PREFETCH_RULES), thread_name_prefix='prefetch')
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.wasted = 0
+        self.misses = 0
+
+    def start(self, text, tool_functions):
+        """Starts the reads `text` suggests and returns their Speculation."""
+        futures = {}
+        if config.get_setting("prefetch_enabled", True):
+            for name, pattern in self.rules.items():
+                func = tool_functions.get(name)
+                if func and pattern.search(text):
+                    futures[_call_key(func, {})] = self._executor.submit(func)
+        if futures:
+            logger.debug(f"Prefetching {', '.join(name for name, _ in futures)}.")
+        return Speculation(self, futures)
+
+    def _count(self, hits=0, wasted=0, misses=0):
+        with self._lock:
+            self.hits += hits
+            self.wasted += wasted
+            self.misses += misses
+
+    def stats(self):
+        with self._lock:
+            started = self.hits + self.wasted
+            return {
+                'hits': self.hits,
+                'wasted': self.wasted,
+                'misses': self.misses,
+                # Share of prefetches that were used, and of prefetchable calls that were predicted
+                'precision': self.hits / started if started else 0.0,
+                'recall': self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+            }
+
+prefetcher = Prefetcher()
@@ -1,52 +1,143 @@
+import hashlib
+import json
 import logging
+import os
+import threading
+import time
+from src.config import config
 from src.services.google_suite import google_suite
 from src.services.brain import brain
 
 logger = logging.getLogger(__name__)
 
+REPORT_STATE_FILE = 'report_state.json'
+
+REPORT_PROMPT = """
+You are generating a {part_of_day} report for the user.
+
+New or changed since the last report (JSON, one item per line):
+{new_items}
+
+Already covered by an earlier report (one-line summaries):
+{known_items}
+
+Write a concise and helpful report. Focus on the new items and highlight important ones;
+mention earlier items only briefly, where they still matter (e.g. an event coming up soon).
+If there are no emails, tasks, or events, mention that the user is clear.
+Structure it nicely with Markdown.
+
+Respond with valid JSON only:
+{{"item_summaries": {{"<key>": "one-line summary"}} for every new or changed item, "report": "<the report in Markdown>"}}
+"""
+
+def _fingerprint(item):
+    return hashlib.sha1(json.dumps(item, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
 class Reporter:
-    def __init__(self):
-        pass
+    """Builds the daily reports incrementally.
 
-    def generate_report(self, part_of_day: str):
-        """Generates a summary report for the user."""
-        try:
-            logger.info(f"Generating {part_of_day} report...")
+    A one-line summary of every email, task and event is kept between reports
+    (in REPORT_STATE_FILE), so each report only sends the model the items that
+    are new or changed and reuses the summaries of the rest.
 
-            # Fetch data
-            emails = google_suite.list_unread_emails(limit=10)
-            tasks = google_suite.list_tasks(limit=10)
-            events = google_suite.list_upcoming_events(hours=12)
+    `prepare` generates a report a few minutes ahead of its slot, and
+    `get_report` hands it over at send time.
+    """
 
-            # Construct context for the Brain
-            context = f"""
-            You are generating a {part_of_day} report for the user.
+    def __init__(self):
+        # item key ("email:<id>") -> {'fingerprint', 'summary'}
+        self.summaries = self._load_state()
+        # part of day -> (report text, time it was generated)
+        self.prepared = {}
+        # Held while generating, so a report due while it is being prepared waits for it
+        self._lock = threading.Lock()
 
-            Unread Emails (last 10):
-            {emails}
+    def _load_state(self):
+        if not os.path.exists(REPORT_STATE_FILE):
+            return {}
+        try:
+            with open(REPORT_STATE_FILE, 'r') as f:
+                return json.load(f).get('summaries', {})
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not load report state, starting fresh: {e}")
+            return {}
 
-            Upcoming Tasks:
-            {tasks}
+    def _save_state(self):
+        tmp_path = REPORT_STATE_FILE + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'summaries': self.summaries}, f)
+            os.replace(tmp_path, REPORT_STATE_FILE)
+        except OSError as e:
+            logger.error(f"Failed to save report state: {e}")
 
-            Upcoming Events (next 12h):
-            {events}
+    def prepare(self, part_of_day: str):
+        """Generates a report ahead of time. Failures are left for `get_report` to retry."""
+        with self._lock:
+            try:
+                self.prepared[part_of_day] = (self._generate(part_of_day), time.time())
+                logger.info(f"{part_of_day} report prepared.")
+            except Exception as e:
+                logger.error(f"Error preparing {part_of_day} report: {e}", exc_info=True)
 
-            Please summarize this information into a concise and helpful report.
-            Highlight important items.
-            If there are no emails, tasks, or events, mention that the user is clear.
-            Structure it nicely with Markdown.
-            """
+    def get_report(self, part_of_day: str):
+        """Returns the prepared report if it is recent, otherwise generates one now."""
+        max_age = (config.get_setting("report_prepare_minutes", 5) + 30) * 60
+        with self._lock:
+            report, generated_at = self.prepared.pop(part_of_day, (None, 0))
+        if report and time.time() - generated_at <= max_age:
+            return report
+        return self.generate_report(part_of_day)
 
-            # Use Brain to generate the text
-            # We use a direct generation request to the model
-            if brain.model:
-                response = brain.model.generate_content(context)
-                return response.text
-            else:
+    def generate_report(self, part_of_day: str):
+        """Generates a summary report for the user."""
+        try:
+            logger.info(f"Generating {part_of_day} report...")
+            if not brain.api_key:
                 return "Brain is offline. Cannot generate report."
-
+            with self._lock:
+                return self._generate(part_of_day)
         except Exception as e:
             logger.error(f"Error generating report: {e}", exc_info=True)
             return "Failed to generate report due to an error."
 
+    def _generate(self, part_of_day):
+        # Fetch data
+        items = {}
+        for email in google_suite.list_unread_emails(limit=10, view='reporter'):
+            items[f"email:{email['id']}"] = email
+        for task in google_suite.list_tasks(limit=10, view='reporter'):
+            items[f"task:{task['id']}"] = task
+        for event in google_suite.list_upcoming_events(hours=12, view='reporter'):
+            items[f"event:{event['id']}"] = event
+
+        fingerprints = {key: _fingerprint(item) for key, item in items.items()}
+        new_keys = [k for k in items if self.summaries.get(k, {}).get('fingerprint') != fingerprints[k]]
+        known_keys = [k for k in items if k not in new_keys]
+        logger.info(f"{part_of_day} report: {len(new_keys)} new or changed items, {len(known_keys)} already summarized.")
+
+        prompt = REPORT_PROMPT.format(
+            part_of_day=part_of_day,
+            new_items="\n".join(json.dumps({'key': k, **items[k]}, default=str) for k in new_keys) or "(none)",
+            known_items="\n".join(f"- {k}: {self.summaries[k]['summary']}" for k in known_keys) or "(none)"
+        )
+        text = brain.generate(prompt, 'report', role='writer', generation_config={"response_mime_type": "application/json"})
+
+        try:
+            data = json.loads(text)
+            report = data['report']
+            item_summaries = data.get('item_summaries') or {}
+        except (json.JSONDecodeError, KeyError, TypeError):
+            logger.warning("Report was not valid JSON, sending it as is.")
+            return text
+
+        # Remember the new summaries and forget items that are gone
+        self.summaries = {
+            k: {'fingerprint': fingerprints[k], 'summary': item_summaries[k] if k in new_keys else self.summaries[k]['summary']}
+            for k in items
+            if k in known_keys or isinstance(item_summaries.get(k), str)
+        }
+        self._save_state()
+        return report
+
 reporter = Reporter()
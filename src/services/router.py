@@ -0,0 +1,141 @@
+import logging
+import math
+import re
+from datetime import datetime, timedelta
+from src.services.google_suite import google_suite
+
+logger = logging.getLogger(__name__)
+
+# Each intent lists phrasings that must match the whole (normalized) message.
+# Anything that does not match exactly goes to Gemini, so keep these strict.
+INTENT_PATTERNS = {
+    'time': [
+        r"(what is )?the (current )?time( now)?",
+        r"what time is it( now)?",
+        r"what is the date( today)?",
+        r"what day is (it|today)",
+    ],
+    'events_today': [
+        r"what is on (my )?(calendar|schedule|agenda)( for)?( today)?",
+        r"what do i have (on )?today",
+        r"(show|list|check)( me)? (my )?(events|meetings|calendar|schedule|agenda)( for)?( today)?",
+        r"(my )?(events|meetings|calendar|schedule|agenda)( for)? today",
+        r"what does my day look like( today)?",
+    ],
+    'events': [
+        r"(show|list|check)( me)? (my )?upcoming (events|meetings)",
+        r"what is (coming )?up next",
+        r"(my )?upcoming (events|meetings)",
+    ],
+    'tasks': [
+        r"(show|list|check)( me)? (my )?(tasks|todos|to dos|todo list|to do list)",
+        r"what (are|is) (on )?my (tasks|todos|to dos|todo list|to do list)",
+        r"(my )?(tasks|todos|to dos|todo list|to do list)",
+    ],
+    'inbox': [
+        r"(show|list|check|read)( me)? (my )?(new |unread )?(emails|email|mail|inbox)",
+        r"(do i have )?(any )?(new |unread )(emails|email|mail)",
+        r"(my )?(unread )?(emails|inbox)",
+    ],
+}
+
+class Router:
+    """Answers common requests directly from Google, without a Gemini round trip."""
+
+    def __init__(self):
+        self.patterns = {
+            intent: [re.compile(p) for p in patterns]
+            for intent, patterns in INTENT_PATTERNS.items()
+        }
+        self.handlers = {
+            'time': self.reply_time,
+            'events_today': self.reply_events_today,
+            'events': self.reply_events,
+            'tasks': self.reply_tasks,
+            'inbox': self.reply_inbox,
+        }
+
+    def _normalize(self, text):
+        text = text.lower().strip()
+        text = text.replace("what's", "what is").replace("whats", "what is").replace("to-do", "to do")
+        text = re.sub(r"[^\w\s]", " ", text)
+        text = re.sub(r"\b(please|kernel|hey|hi)\b", " ", text)
+        return re.sub(r"\s+", " ", text).strip()
+
+    def match(self, text):
+        """Returns the intent name when the message confidently matches one, else None."""
+        normalized = self._normalize(text)
+        for intent, patterns in self.patterns.items():
+            if any(p.fullmatch(normalized) for p in patterns):
+                return intent
+        return None
+
+    def route(self, text):
+        """Returns a reply for a fast-path message, or None to fall back to Gemini."""
+        intent = self.match(text)
+        if not intent:
+            return None
+
+        logger.info(f"Fast path: answering '{intent}' without Gemini.")
+        try:
+            return self.handlers[intent]()
+        except Exception as e:
+            logger.error(f"Fast path '{intent}' failed, falling back to Gemini: {e}")
+            return None
+
+    # --- Templated replies ---
+    # Reads that fail must raise rather than look empty, so `route` falls back to Gemini
+    # instead of answering e.g. that the calendar is clear.
+
+    def _format_time(self, start):
+        if 'T' not in start:
+            return "All day"
+        try:
+            return datetime.fromisoformat(start.replace('Z', '+00:00')).astimezone().strftime("%H:%M")
+        except ValueError:
+            return start
+
+    def _start_date(self, start):
+        if 'T' not in start:
+            return datetime.fromisoformat(start).date()
+        return datetime.fromisoformat(start.replace('Z', '+00:00')).astimezone().date()
+
+    def reply_time(self):
+        return datetime.now().strftime("It's %H:%M on %A, %B %d, %Y.")
+
+    def reply_events_today(self):
+        now = datetime.now().astimezone()
+        end_of_day = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        # Whole hours, so the read is cached under the same key all hour
+        hours = math.ceil((end_of_day - now).total_seconds() / 3600)
+        events = [e for e in google_suite.load_upcoming_events(hours=hours) if self._start_date(e['start']) <= now.date()]
+        if not events:
+            return "Your calendar is clear for the rest of today."
+        lines = [f"- {self._format_time(e['start'])} {e['summary']}" for e in events]
+        return "Today's events:\n" + "\n".join(lines)
+
+    def reply_events(self, hours=24):
+        events = google_suite.load_upcoming_events(hours=hours)
+        if not events:
+            return f"No events in the next {hours} hours."
+        lines = [f"- {self._format_time(e['start'])} {e['summary']}" for e in events]
+        return f"Events in the next {hours} hours:\n" + "\n".join(lines)
+
+    def reply_tasks(self, limit=10):
+        tasks = google_suite.load_tasks(limit=limit)
+        if not tasks:
+            return "You have no open tasks."
+        lines = []
+        for task in tasks:
+            due = f" (due {task['due'][:10]})" if task.get('due') else ""
+            lines.append(f"- {task['title']}{due}")
+        return "Your tasks:\n" + "\n".join(lines)
+
+    def reply_inbox(self, limit=5):
+        emails = google_suite.load_unread_emails(limit=limit)
+        if not emails:
+            return "No unread emails."
+        lines = [f"- {e['sender']}: {e['subject']}" for e in emails]
+        return "Unread emails:\n" + "\n".join(lines)
+
+router = Router()
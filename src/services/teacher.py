@@ -32,9 +32,8 @@ class Teacher:
             Make it engaging and concise.
             """
 
-            if brain.model:
-                response = brain.model.generate_content(context)
-                return f"🎓 **English Lesson**\n\n{response.text}"
+            if brain.api_key:
+                return f"🎓 **English Lesson**\n\n{brain.generate(context, 'lesson')}"
             else:
                 return None
 
@@ -63,9 +62,8 @@ class Teacher:
             Keep it concise and formatted for a Telegram message.
             """
 
-            if brain.model:
-                response = brain.model.generate_content(context)
-                return f"📖 **Word of the Day**\n\n{response.text}"
+            if brain.api_key:
+                return f"📖 **Word of the Day**\n\n{brain.generate(context, 'lesson')}"
             else:
                 return None
         except Exception as e:
@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from email.utils import parseaddr
+from googleapiclient.errors import HttpError
+
+from src.config import config
+from src.services.google_suite import google_suite
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+EXAMPLES_FILE = 'triage_examples.jsonl'
+MODEL_FILE = 'triage_model.npz'
+
+# Size of the hashed feature space
+N_FEATURES = 2 ** 18
+# Emails remembered for feedback on their alerts
+RECENT_EMAILS = 1000
+
+def _features(email):
+    """Hashes the sender, its domain, subject words and Gmail labels into feature indexes."""
+    address = parseaddr(email.get('sender', ''))[1].lower()
+    tokens = [f"from:{address}", f"domain:{address.rpartition('@')[2]}"]
+    tokens += [f"subj:{t}" for t in re.findall(r"\w+", email.get('subject', '').lower()) if len(t) > 1]
+    tokens += [f"label:{label}" for label in email.get('labels', [])]
+    # crc32 rather than hash(), which changes between processes
+    return np.unique(np.array([zlib.crc32(t.encode()) % N_FEATURES for t in tokens], dtype=np.int64))
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+class TriageModel:
+    """Local logistic regression that learns which emails are important.
+
+    It is trained on labeled examples stored in EXAMPLES_FILE: the user's
+    👍/👎 on alerts, and the decisions Gemini made while the model was unsure
+    (weighted lower). Once trained on enough examples it decides confident
+    cases locally, so only the unsure ones go to Gemini. Retraining runs in a
+    background thread, from scratch on all examples.
+
+    Disabled when NumPy is not installed.
+    """
+
+    def __init__(self):
+        self.available = np is not None
+        self.weights = None
+        self.bias = 0.0
+        self.trained_on = 0
+        self.recent = OrderedDict()  # email id -> email, for feedback on alerts
+        self._new_examples = 0
+        self._training = False
+        self._retrain_again = False
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        if self.available:
+            self._load()
+
+    # --- Persistence ---
+
+    def _load(self):
+        if not os.path.exists(MODEL_FILE):
+            return
+        try:
+            with np.load(MODEL_FILE) as data:
+                self.weights = data['weights']
+                self.bias = float(data['bias'])
+                self.trained_on = int(data['trained_on'])
+            logger.info(f"Triage model loaded, trained on {self.trained_on} examples.")
+        except (OSError, KeyError, ValueError) as e:
+            logger.error(f"Failed to load triage model: {e}")
+
+    def _save(self, weights, bias, trained_on):
+        # np.savez appends .npz to names without it, so keep the suffix on the temp file
+        tmp_path = MODEL_FILE + '.tmp.npz'
+        np.savez(tmp_path, weights=weights, bias=bias, trained_on=trained_on)
+        os.replace(tmp_path, MODEL_FILE)
+
+    def _append_example(self, email, important, source):
+        example = {
+            'ts': round(time.time()),
+            'id': email['id'],
+            'sender': email.get('sender', ''),
+            'subject': email.get('subject', ''),
+            'labels': email.get('labels', []),
+            'important': bool(important),
+            'source': source
+        }
+        with self._file_lock:
+            with open(EXAMPLES_FILE, 'a') as f:
+                f.write(json.dumps(example) + '\n')
+
+    def _load_examples(self):
+        """Returns the stored examples, one per email. The user's label wins over Gemini's."""
+        examples = {}
+        with self._file_lock:
+            if not os.path.exists(EXAMPLES_FILE):
+                return []
+            with open(EXAMPLES_FILE, 'r') as f:
+                for line in f:
+                    try:
+                        example = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    previous = examples.get(example['id'])
+                    if previous and previous['source'] == 'user' and example['source'] != 'user':
+                        continue
+                    examples[example['id']] = example
+        return list(examples.values())
+
+    # --- Inference ---
+
+    def predict(self, email):
+        """Returns (important, probability) when the model is confident, else None."""
+        if not self.available or self.weights is None:
+            return None
+        if self.trained_on < config.get_setting("triage_model_min_examples", 50):
+            return None
+        p = float(_sigmoid(self.bias + self.weights[_features(email)].sum()))
+        threshold = config.get_setting("triage_model_confidence", 0.9)
+        if p >= threshold:
+            return True, p
+        if p <= 1 - threshold:
+            return False, p
+        return None
+
+    # --- Learning ---
+
+    def observe(self, email, important=None, source='llm'):
+        """Remembers an email the poller triaged. Pass `important` to store Gemini's decision as an example."""
+        with self._lock:
+            self.recent[email['id']] = email
+            self.recent.move_to_end(email['id'])
+            while len(self.recent) > RECENT_EMAILS:
+                self.recent.popitem(last=False)
+        if important is None:
+            return
+
+        self._append_example(email, important, source)
+        with self._lock:
+            self._new_examples += 1
+            retrain = self._new_examples >= config.get_setting("triage_model_retrain_every", 20)
+        if retrain:
+            self.retrain_in_background()
+
+    def record_feedback(self, msg_id, important):
+        """Stores the user's label for an alerted email and retrains. Returns False if the email is unknown."""
+        with self._lock:
+            email = self.recent.get(msg_id)
+        if email is None:
+            try:
+                email = google_suite.get_email_metadata(msg_id)
+            except HttpError as e:
+                logger.error(f"Failed to load email for feedback: {e}")
+                return False
+            if email is None:
+                return False
+
+        self._append_example(email, important, 'user')
+        logger.info(f"Triage feedback: {msg_id} is {'important' if important else 'not important'}.")
+        self.retrain_in_background()
+        return True
+
+    def retrain_in_background(self):
+        if not self.available:
+            return
+        with self._lock:
+            self._new_examples = 0
+            if self._training:
+                # Picked up by the running thread once it finishes
+                self._retrain_again = True
+                return
+            self._training = True
+        threading.Thread(target=self._train_loop, name="triage-train", daemon=True).start()
+
+    def _train_loop(self):
+        while True:
+            try:
+                self._train()
+            except Exception as e:
+                logger.error(f"Triage model training failed: {e}", exc_info=True)
+            with self._lock:
+                if not self._retrain_again:
+                    self._training = False
+                    return
+                self._retrain_again = False
+
+    def _train(self):
+        examples = self._load_examples()
+        labels = {e['important'] for e in examples}
+        if len(labels) < 2:
+            return
+
+        epochs = config.get_setting("triage_model_epochs", 5)
+        learning_rate = config.get_setting("triage_model_learning_rate", 0.1)
+        l2 = config.get_setting("triage_model_l2", 1e-4)
+        user_weight = config.get_setting("triage_model_user_weight", 5.0)
+
+        # From scratch on the full set every time: warm starting would give early
+        # examples `epochs` more passes per retrain and make the model overconfident
+        weights = np.zeros(N_FEATURES, dtype=np.float32)
+        bias = 0.0
+        data = [
+            (_features(e), 1.0 if e['important'] else 0.0, user_weight if e['source'] == 'user' else 1.0)
+            for e in examples
+        ]
+        started = time.monotonic()
+        rng = np.random.default_rng()
+        for _ in range(epochs):
+            for i in rng.permutation(len(data)):
+                idx, y, sample_weight = data[i]
+                gradient = (_sigmoid(bias + weights[idx].sum()) - y) * sample_weight
+                weights[idx] -= learning_rate * (gradient + l2 * weights[idx])
+                bias -= learning_rate * gradient
+
+        self._save(weights, bias, len(data))
+        # Trained on a copy and swapped in, so predictions never see a half-trained model
+        self.weights, self.bias, self.trained_on = weights, float(bias), len(data)
+        logger.info(f"Triage model trained on {len(data)} examples in {time.monotonic() - started:.1f}s.")
+
+triage_model = TriageModel()
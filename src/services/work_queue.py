@@ -0,0 +1,204 @@
+import sqlite3
+import json
+import time
+import logging
+from src.config import config
+
+logger = logging.getLogger(__name__)
+
+QUEUE_FILE = 'work_queue.db'
+
+class WorkQueue:
+    """Durable job queue shared by the ingestion process and the workers.
+
+    Jobs for the same chat are handed out strictly in arrival order, one at a
+    time, and always to the same worker: the conversation history lives in the
+    worker's memory. A job stays in the table until a worker acknowledges it, so a worker
+    that dies mid-job only delays it until its lease expires. Running jobs
+    renew their lease, and only the worker holding it can acknowledge a job.
+    """
+
+    def __init__(self, path=QUEUE_FILE):
+        self.path = path
+        self._initialized = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    leased_until REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_chat ON jobs (chat_id, id)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS replies (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    reply_to INTEGER,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._initialized = True
+        return conn
+
+    # --- Ingestion side ---
+
+    def enqueue(self, chat_id, kind, payload):
+        """Adds a job for a chat. Returns the job id."""
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "INSERT INTO jobs (chat_id, kind, payload, created_at) VALUES (?, ?, ?, ?)",
+                (chat_id, kind, json.dumps(payload), time.time())
+            )
+            return cur.lastrowid
+        finally:
+            conn.close()
+
+    def fetch_replies(self, limit=50):
+        """Returns replies produced by workers, oldest first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, chat_id, text, reply_to FROM replies ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def delete_reply(self, reply_id):
+        """Removes a reply once it has been delivered."""
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM replies WHERE id = ?", (reply_id,))
+        finally:
+            conn.close()
+
+    # --- Worker side ---
+
+    def claim(self, worker_name, index=0, count=1):
+        """Leases the next runnable job of worker `index` out of `count`, or returns None.
+
+        A job is runnable when no other job of the same chat is currently
+        leased, and it is the oldest job of its chat. Jobs whose lease expired
+        (their worker crashed) become runnable again, for its restarted
+        successor. Chats are split between workers by chat id.
+        """
+        lease_seconds = config.get_setting("worker_lease_seconds", 300)
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("""
+                SELECT * FROM jobs
+                WHERE id IN (SELECT MIN(id) FROM jobs GROUP BY chat_id)
+                  AND (leased_until IS NULL OR leased_until < ?)
+                  AND abs(chat_id) % ? = ?
+                ORDER BY id LIMIT 1
+            """, (now, count, index)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET worker = ?, leased_until = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker_name, now + lease_seconds, row['id'])
+            )
+            conn.execute("COMMIT")
+
+            job = dict(row)
+            job['attempts'] += 1
+            job['payload'] = json.loads(job['payload'])
+            return job
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def renew(self, job_id, worker_name):
+        """Extends the lease of a job the worker is still running. Returns False if it lost the lease."""
+        lease_seconds = config.get_setting("worker_lease_seconds", 300)
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "UPDATE jobs SET leased_until = ? WHERE id = ? AND worker = ?",
+                (time.time() + lease_seconds, job_id, worker_name)
+            )
+            return cur.rowcount > 0
+        finally:
+            conn.close()
+
+    def complete(self, job_id, worker_name, chat_id, replies, reply_to=None):
+        """Acknowledges a job and stores its replies in one transaction.
+
+        Returns False, storing nothing, if the job's lease went to another worker.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.execute("DELETE FROM jobs WHERE id = ? AND worker = ?", (job_id, worker_name))
+            if cur.rowcount == 0:
+                conn.execute("ROLLBACK")
+                return False
+            for text in replies:
+                conn.execute(
+                    "INSERT INTO replies (chat_id, text, reply_to, created_at) VALUES (?, ?, ?, ?)",
+                    (chat_id, text, reply_to, time.time())
+                )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def release(self, job_id, worker_name):
+        """Gives a job back to the queue so another worker can retry it."""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE jobs SET worker = NULL, leased_until = NULL WHERE id = ? AND worker = ?",
+                (job_id, worker_name)
+            )
+        finally:
+            conn.close()
+
+    def release_all(self, worker_name):
+        """Gives back the jobs leased to `worker_name`. Returns how many there were.
+
+        Called when a worker starts: a restarted worker has its predecessor's
+        name, and the job that one was running should not wait for its lease.
+        """
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "UPDATE jobs SET worker = NULL, leased_until = NULL WHERE worker = ? AND leased_until IS NOT NULL",
+                (worker_name,)
+            )
+            return cur.rowcount
+        finally:
+            conn.close()
+
+    def pending_count(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        finally:
+            conn.close()
+
+work_queue = WorkQueue()
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates concurrently while keeping each chat in order.
+
+    Updates from different chats run in parallel, updates from the same chat
+    run one after the other in the order they arrived. At most
+    `max_in_flight` handlers run at once; the rest wait for a free slot.
+    """
+
+    def __init__(self, max_in_flight, max_pending=256):
+        # The base class semaphore only bounds how many updates may wait here
+        super().__init__(max(max_pending, max_in_flight))
+        self.max_in_flight = max_in_flight
+        self._in_flight = asyncio.BoundedSemaphore(max_in_flight)
+        self._chat_locks = {}
+        self._chat_waiters = {}
+
+    async def do_process_update(self, update, coroutine):
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            async with self._in_flight:
+                await coroutine
+            return
+
+        chat_id = chat.id
+        lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+        self._chat_waiters[chat_id] = self._chat_waiters.get(chat_id, 0) + 1
+        try:
+            # asyncio.Lock wakes waiters in FIFO order, which keeps the chat ordered.
+            # The chat lock is taken before the global slot so a busy chat only
+            # ever occupies one slot.
+            async with lock:
+                async with self._in_flight:
+                    await coroutine
+        finally:
+            self._chat_waiters[chat_id] -= 1
+            if not self._chat_waiters[chat_id]:
+                del self._chat_waiters[chat_id]
+                del self._chat_locks[chat_id]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,126 @@
+import logging
+import os
+import sys
+import time
+import signal
+import threading
+
+from src.log_setup import setup_logging
+
+WORKER_NAME = sys.argv[1] if len(sys.argv) > 1 else f"worker-{os.getpid()}"
+# This worker's share of the chats: the ones with chat_id % WORKER_COUNT == WORKER_INDEX
+WORKER_INDEX = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+WORKER_COUNT = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+# Setup Logging before the services are imported so startup errors are captured.
+# Each worker rotates its own file, rotating a shared one from several processes is unsafe.
+setup_logging(f"kernel-{WORKER_NAME}.log")
+logger = logging.getLogger(__name__)
+
+try:
+    from src.config import config
+    from src.services.event_log import event_log, worker_event_log_file
+    # Its own event log too, set before the services record anything
+    event_log.path = worker_event_log_file(WORKER_NAME)
+    from src.services.brain import brain
+    from src.services.work_queue import work_queue
+    from src.services.router import router
+    from src.profiler import profiler
+except Exception as e:
+    logger.critical(f"Failed to import dependencies: {e}", exc_info=True)
+    sys.exit(1)
+
+_running = True
+
+def _stop(signum, frame):
+    global _running
+    logger.info(f"Worker received signal {signum}, finishing current job...")
+    _running = False
+
+def _profile(signum, frame):
+    # Profiles this worker in the background, the files are written to profiles/
+    seconds = config.get_setting("profile_default_seconds", 30)
+    threading.Thread(target=_profile_quietly, args=(seconds,), name="profiler", daemon=True).start()
+
+def _profile_quietly(seconds):
+    try:
+        profiler.profile(seconds)
+    except RuntimeError as e:
+        logger.warning(str(e))
+
+def _keep_lease(job_id, name, done):
+    """Renews a job's lease until `done` is set, so long jobs are not handed to another worker."""
+    interval = config.get_setting("worker_lease_seconds", 300) / 3
+    while not done.wait(interval):
+        if not work_queue.renew(job_id, name):
+            logger.warning(f"Worker {name} lost the lease on job {job_id}.")
+            return
+
+def process_job(job):
+    """Runs a job and returns the list of reply texts for the chat."""
+    kind = job['kind']
+    payload = job['payload']
+
+    if kind == 'text':
+        reply = router.route(payload['text'])
+        if reply is None:
+            reply = brain.process_user_intent(payload['text'], job['chat_id'])
+        return [reply]
+    if kind == 'voice':
+        return [brain.process_user_voice(payload['path'], job['chat_id'])]
+
+    logger.error(f"Unknown job kind: {kind}")
+    return []
+
+def run_worker(name, index=0, count=1):
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, _profile)
+
+    max_attempts = config.get_setting("worker_max_attempts", 3)
+    idle_sleep = config.get_setting("worker_poll_interval_seconds", 0.5)
+    logger.info(f"Worker {name} started ({index + 1} of {count}).")
+    released = work_queue.release_all(name)
+    if released:
+        logger.info(f"Worker {name} retrying {released} job(s) left by its previous run.")
+
+    while _running:
+        job = work_queue.claim(name, index, count)
+        if not job:
+            time.sleep(idle_sleep)
+            continue
+
+        logger.info(f"Worker {name} picked up job {job['id']} ({job['kind']}, attempt {job['attempts']}).")
+        # Pick up settings saved from the Dashboard
+        config.reload_settings()
+
+        done = threading.Event()
+        threading.Thread(target=_keep_lease, args=(job['id'], name, done), name="lease", daemon=True).start()
+        try:
+            if job['attempts'] > max_attempts:
+                logger.error(f"Job {job['id']} failed {max_attempts} times, giving up.")
+                replies = ["I encountered an error while processing your message."]
+            else:
+                try:
+                    replies = process_job(job)
+                except Exception as e:
+                    logger.error(f"Error processing job {job['id']}: {e}", exc_info=True)
+                    work_queue.release(job['id'], name)
+                    continue
+        finally:
+            done.set()
+
+        if not work_queue.complete(job['id'], name, job['chat_id'], replies, reply_to=job['payload'].get('message_id')):
+            logger.warning(f"Job {job['id']} was taken over by another worker, dropping its replies.")
+            continue
+
+        # Voice files are only removed once the job is acknowledged, so a retry can still read them
+        path = job['payload'].get('path')
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    logger.info(f"Worker {name} stopped.")
+
+if __name__ == '__main__':
+    run_worker(WORKER_NAME, WORKER_INDEX, WORKER_COUNT)
@@ -0,0 +1,247 @@
+import email
+import json
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+pytest.importorskip("googleapiclient")
+pytest.importorskip("google_auth_oauthlib")
+
+import httplib2
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMock
+
+from src.services import google_suite as google_suite_module
+from src.services.google_suite import GoogleSuite, PROJECTIONS, TimedHttpRequest
+
+MESSAGES = {
+    f"m{i}": {
+        'id': f"m{i}", 'threadId': f"t{i}", 'historyId': '12345', 'internalDate': '1700000000000',
+        'sizeEstimate': 48213, 'snippet': f"Snippet of message {i}", 'labelIds': ['UNREAD', 'INBOX'],
+        'payload': {
+            'mimeType': 'multipart/alternative',
+            'headers': [
+                {'name': 'Subject', 'value': f"Subject {i}"},
+                {'name': 'From', 'value': 'Alice <alice@example.com>'},
+                {'name': 'To', 'value': 'me@example.com'},
+                {'name': 'Date', 'value': 'Tue, 14 Nov 2023 22:13:20 +0000'},
+                {'name': 'Received', 'value': 'from mail.example.com by mx.google.com ' * 5},
+            ],
+            'parts': [{'mimeType': 'text/html', 'body': {'size': 4096, 'data': 'PGh0bWw+' * 512}}],
+        },
+    }
+    for i in range(3)
+}
+
+EVENTS = [
+    {
+        'id': f"e{i}", 'status': 'confirmed', 'htmlLink': f"https://calendar.google.com/event?eid=e{i}",
+        'summary': f"Event {i}", 'description': 'Agenda: ' + 'item, ' * 50,
+        'start': {'dateTime': f"2030-01-0{i + 1}T10:00:00Z"}, 'end': {'dateTime': f"2030-01-0{i + 1}T11:00:00Z"},
+        'attendees': [{'email': f"person{n}@example.com", 'responseStatus': 'accepted'} for n in range(10)],
+        'organizer': {'email': 'boss@example.com'}, 'etag': '"3391"', 'iCalUID': f"e{i}@google.com",
+    }
+    for i in range(3)
+]
+
+TASKS = [
+    {
+        'id': f"k{i}", 'kind': 'tasks#task', 'etag': '"LTE4"', 'title': f"Task {i}", 'notes': f"Notes {i}",
+        'due': f"2030-01-0{i + 1}T00:00:00.000Z", 'status': 'needsAction', 'updated': '2023-11-14T22:13:20.000Z',
+        'selfLink': f"https://www.googleapis.com/tasks/v1/lists/l1/tasks/k{i}", 'position': '00000000000000000000',
+        'links': [], 'webViewLink': f"https://tasks.google.com/task/k{i}",
+    }
+    for i in range(3)
+]
+
+def _split_top(mask):
+    """Splits a fields mask on the commas that are not inside parentheses."""
+    parts, depth, current = [], 0, ''
+    for char in mask:
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        current += char
+    return parts + [current]
+
+def _apply_mask(resource, mask):
+    """Keeps the parts of a resource selected by a `fields=` mask, as Google does."""
+    if isinstance(resource, list):
+        return [_apply_mask(item, mask) for item in resource]
+    result = {}
+    for term in _split_top(mask):
+        if '(' in term:
+            name, inner = term[:-1].split('(', 1)
+        elif '/' in term:
+            name, inner = term.split('/', 1)
+        else:
+            name, inner = term, None
+        if name not in resource:
+            continue
+        value = resource[name] if inner is None else _apply_mask(resource[name], inner)
+        if isinstance(value, dict) and isinstance(result.get(name), dict):
+            result[name].update(value)
+        else:
+            result[name] = value
+    return result
+
+class FakeGoogle(HttpMock):
+    """Serves Gmail, Calendar and Tasks reads from the resources above, honouring field masks.
+
+    Every request, including the ones inside batch calls, is recorded in
+    `requests` as (path, query, response size in bytes).
+    """
+
+    def __init__(self):
+        super().__init__(headers={'status': '200', 'content-type': 'application/json'})
+        self.requests = []
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=1, connection_type=None):
+        path = urlsplit(uri).path
+        if path.startswith('/batch'):
+            return self._batch(body, headers)
+        content = self._serve(uri)
+        return httplib2.Response({'status': '200', 'content-type': 'application/json'}), content.encode()
+
+    def _serve(self, uri):
+        parts = urlsplit(uri)
+        query = parse_qs(parts.query)
+        path = parts.path
+        if path.endswith('/users/me/messages'):
+            resource = {'messages': [{'id': m['id'], 'threadId': m['threadId']} for m in MESSAGES.values()], 'resultSizeEstimate': 3}
+        elif '/users/me/messages/' in path:
+            resource = json.loads(json.dumps(MESSAGES[path.rsplit('/', 1)[1]]))
+            if query.get('format') == ['metadata']:
+                del resource['payload']['parts']
+                wanted = query.get('metadataHeaders')
+                if wanted:
+                    resource['payload']['headers'] = [h for h in resource['payload']['headers'] if h['name'] in wanted]
+        elif path.endswith('/users/me/calendarList'):
+            resource = {'kind': 'calendar#calendarList', 'items': [{'id': 'me@example.com', 'summary': 'Me', 'primary': True, 'accessRole': 'owner'}]}
+        elif path.endswith('/events'):
+            resource = {'kind': 'calendar#events', 'summary': 'Me', 'timeZone': 'UTC', 'items': EVENTS}
+        elif path.endswith('/users/@me/lists'):
+            resource = {'kind': 'tasks#taskLists', 'items': [{'id': 'l1', 'title': 'My Tasks', 'updated': '2023-11-14T22:13:20.000Z'}]}
+        elif path.endswith('/tasks'):
+            resource = {'kind': 'tasks#tasks', 'etag': '"LTE4"', 'items': TASKS}
+        else:
+            raise AssertionError(f"Unexpected request: {uri}")
+
+        if 'fields' in query:
+            resource = _apply_mask(resource, query['fields'][0])
+        content = json.dumps(resource)
+        self.requests.append((path, query, len(content)))
+        return content
+
+    def _batch(self, body, headers):
+        message = email.message_from_string(f"content-type: {headers['content-type']}\r\n\r\n{body}")
+        boundary = 'batch_response'
+        lines = []
+        for part in message.get_payload():
+            request_line = part.get_payload().lstrip().split('\n', 1)[0]
+            content = self._serve(request_line.split(' ')[1])
+            lines += [
+                f"--{boundary}", "Content-Type: application/http",
+                f"Content-ID: <response-{part['Content-ID'][1:-1]}>", "",
+                "HTTP/1.1 200 OK", "Content-Type: application/json", "", content,
+            ]
+        lines.append(f"--{boundary}--")
+        resp = httplib2.Response({'status': '200', 'content-type': f"multipart/mixed; boundary={boundary}"})
+        return resp, '\r\n'.join(lines).encode()
+
+    def reads(self, suffix):
+        return [(query, size) for path, query, size in self.requests if path.endswith(suffix)]
+
+@pytest.fixture
+def fake(monkeypatch):
+    monkeypatch.setattr(google_suite_module.event_log, 'record', lambda *args, **kwargs: None)
+    monkeypatch.setattr(google_suite_module.config, 'get_setting', lambda key, default=None: default)
+    return FakeGoogle()
+
+@pytest.fixture
+def suite(fake, monkeypatch):
+    monkeypatch.setattr(GoogleSuite, 'authenticate', lambda self: None)
+    suite = GoogleSuite()
+    suite.gmail_service = build('gmail', 'v1', http=fake, requestBuilder=TimedHttpRequest, static_discovery=True)
+    suite.calendar_service = build('calendar', 'v3', http=fake, requestBuilder=TimedHttpRequest, static_discovery=True)
+    suite.tasks_service = build('tasks', 'v1', http=fake, requestBuilder=TimedHttpRequest, static_discovery=True)
+    return suite
+
+EXPECTED_EMAIL_READS = {
+    'poller': ('id,labelIds,payload/headers,snippet', ['Subject', 'From']),
+    'reporter': ('id,payload/headers,snippet', ['Subject', 'From']),
+    'tools': ('id,labelIds,payload/headers,snippet', ['Subject', 'From']),
+}
+EXPECTED_EVENT_FIELDS = {
+    'reporter': 'items(id,start,summary)',
+    'tools': 'items(htmlLink,id,start,summary)',
+}
+EXPECTED_TASK_FIELDS = {
+    'reporter': 'items(due,id,notes,title),nextPageToken',
+    'tools': 'items(due,id,notes,selfLink,title),nextPageToken',
+}
+
+def _full_size(resource):
+    return len(json.dumps(resource))
+
+@pytest.mark.parametrize('view', sorted(EXPECTED_EMAIL_READS))
+def test_email_reads(suite, fake, view):
+    emails = suite.list_unread_emails(limit=3, view=view)
+
+    assert [e['id'] for e in emails] == list(MESSAGES)
+    assert all(tuple(e) == ('id', *PROJECTIONS[view]['email']) for e in emails)
+    assert fake.reads('/users/me/messages')[0][0]['fields'] == ['messages/id,nextPageToken']
+
+    fields, headers = EXPECTED_EMAIL_READS[view]
+    gets = fake.reads('/m0') + fake.reads('/m1') + fake.reads('/m2')
+    assert len(gets) == 3
+    for query, size in gets:
+        assert query['format'] == ['metadata']
+        assert query['fields'] == [fields]
+        assert query['metadataHeaders'] == headers
+        assert size < _full_size(MESSAGES['m0']) / 4
+
+@pytest.mark.parametrize('view', sorted(EXPECTED_EVENT_FIELDS))
+def test_event_reads(suite, fake, view):
+    events = suite.list_upcoming_events(hours=24 * 365 * 10, view=view)
+
+    assert [e['id'] for e in events] == [e['id'] for e in EVENTS]
+    assert all(tuple(e) == ('id', *PROJECTIONS[view]['event']) for e in events)
+    assert fake.reads('/users/me/calendarList')[0][0]['fields'] == ['items(id,summary,summaryOverride,primary,selected),nextPageToken']
+
+    (query, size), = fake.reads('/events')
+    assert query['fields'] == [EXPECTED_EVENT_FIELDS[view]]
+    assert size < _full_size({'items': EVENTS}) / 4
+
+@pytest.mark.parametrize('view', sorted(EXPECTED_TASK_FIELDS))
+def test_task_reads(suite, fake, view):
+    tasks = suite.list_tasks(limit=3, view=view)
+
+    assert [t['id'] for t in tasks] == [t['id'] for t in TASKS]
+    assert all(tuple(t) == ('id', *PROJECTIONS[view]['task']) for t in tasks)
+    assert fake.reads('/users/@me/lists')[0][0]['fields'] == ['items(id,title),nextPageToken']
+
+    (query, size), = fake.reads('/tasks')
+    assert query['fields'] == [EXPECTED_TASK_FIELDS[view]]
+    assert size < _full_size({'items': TASKS}) / 2
+
+def test_reporter_reads_less_than_tools(suite, fake):
+    sizes = {}
+    for view in ('reporter', 'tools'):
+        fake.requests.clear()
+        suite.list_unread_emails(limit=3, view=view)
+        suite.list_upcoming_events(hours=24 * 365 * 10, view=view)
+        suite.list_tasks(limit=3, view=view)
+        sizes[view] = sum(size for _, _, size in fake.requests)
+    assert sizes['reporter'] < sizes['tools']
+
+def test_mail_index_metadata_is_batched(suite, fake, monkeypatch):
+    monkeypatch.setattr(suite, 'get_email_metadata', lambda msg_id: pytest.fail("read outside the batch"))
+    metadata = suite.get_emails_metadata(MESSAGES)
+
+    assert sorted(metadata) == sorted(MESSAGES)
+    assert metadata['m1']['subject'] == 'Subject 1' and metadata['m1']['to'] == 'me@example.com'
+    gets = fake.reads('/m0') + fake.reads('/m1') + fake.reads('/m2')
+    assert [query['metadataHeaders'] for query, _ in gets] == [['Subject', 'From', 'To']] * 3
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+telegram = pytest.importorskip("telegram")
+
+from src.update_processor import PerChatUpdateProcessor
+
+def _update(update_id, chat_id):
+    chat = telegram.Chat(chat_id, 'private')
+    message = telegram.Message(update_id, datetime.now(timezone.utc), chat)
+    return telegram.Update(update_id, message=message)
+
+def _run(processor, updates, delay=0.05):
+    """Feeds `updates` (update id, chat id) to the processor and returns the handler events in order."""
+    events = []
+
+    async def handle(update_id, chat_id):
+        events.append(('start', chat_id, update_id))
+        await asyncio.sleep(delay)
+        events.append(('end', chat_id, update_id))
+
+    async def main():
+        await asyncio.gather(*(
+            processor.process_update(_update(update_id, chat_id), handle(update_id, chat_id))
+            for update_id, chat_id in updates
+        ))
+
+    asyncio.run(main())
+    return events
+
+def test_chats_overlap_and_stay_in_order():
+    processor = PerChatUpdateProcessor(max_in_flight=4)
+    events = _run(processor, [(1, 100), (2, 200), (3, 100), (4, 200), (5, 100)])
+
+    # Each chat runs its updates one at a time, in arrival order
+    for chat_id, expected in ((100, [1, 3, 5]), (200, [2, 4])):
+        chat_events = [(kind, update_id) for kind, c, update_id in events if c == chat_id]
+        assert chat_events == [(kind, u) for u in expected for kind in ('start', 'end')]
+
+    # The first update of each chat starts before either finishes
+    first_end = next(i for i, event in enumerate(events) if event[0] == 'end')
+    assert {('start', 100, 1), ('start', 200, 2)} <= set(events[:first_end])
+
+def test_in_flight_limit():
+    processor = PerChatUpdateProcessor(max_in_flight=2)
+    events = _run(processor, [(i, i) for i in range(1, 7)])
+
+    running = peak = 0
+    for kind, _, _ in events:
+        running += 1 if kind == 'start' else -1
+        peak = max(peak, running)
+    assert peak == 2
+    # Chat locks are dropped once a chat has nothing queued
+    assert not processor._chat_locks